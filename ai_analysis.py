@@ -3,17 +3,59 @@
 AI政策分析与量化模块
 实现PRD中的AI分析与量化功能 (Analytics & Quantification)
 """
+import heapq
 import re
 import pandas as pd
 import numpy as np
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Tuple
+from functools import lru_cache
+from itertools import chain, product
+from operator import itemgetter
+from typing import Dict, List, Any, NamedTuple, Optional, Tuple, Union
 import logging
 
+import ahocorasick
+
 # 设置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 文本特征正则，模块加载时编译一次
+_DEADLINE_RE = re.compile(r'\d{4}年\d{1,2}月')
+_URGENCY_RE = re.compile(r'紧急|立即|尽快|马上')
+
+def _case_variants(keyword: str) -> List[str]:
+    """枚举关键词中英文字母的全部大小写组合(中文字符保持不变)"""
+    return [''.join(chars) for chars in product(*({c.lower(), c.upper()} for c in keyword))]
+
+def _keyword_pattern(keyword: str) -> str:
+    """关键词的正则片段，含英文字母时局部忽略大小写，纯中文关键词按原样匹配"""
+    escaped = re.escape(keyword)
+    return f'(?i:{escaped})' if keyword.lower() != keyword.upper() else escaped
+
+def _as_frame(policies: Union[pd.DataFrame, List[Dict[str, Any]]]) -> pd.DataFrame:
+    """将政策列表统一转换为DataFrame"""
+    if isinstance(policies, pd.DataFrame):
+        return policies
+    return pd.DataFrame(policies)
+
+def _text_column(df: pd.DataFrame, column: str) -> pd.Series:
+    """取出文本列，缺失值与缺失列均视为空字符串"""
+    if column not in df.columns:
+        return pd.Series('', index=df.index, dtype=object)
+    return df[column].fillna('').astype(str)
+
+class PolicyAnalysis(NamedTuple):
+    """单个政策的分析结果(不含时间戳)，不可变且可哈希，便于缓存复用"""
+    regulatory_score: float
+    identified_domains: Tuple[str, ...]
+    enforcement_level: str
+    content_length: int
+    has_penalties: bool
+    has_deadlines: bool
+    urgency_indicators: int
+
 class PolicyAnalyzer:
     """政策分析器 - 实现LLM风格的多维度结构化标注"""
     
@@ -64,6 +106,49 @@ class PolicyAnalyzer:
             "指导性文件": ["意见", "通知", "指导", "建议", "倡议", "指南"]
         }
         
+        # 强制程度关键词反向索引：关键词 -> 所属类型(如"指南"同时属于两类)
+        kw_to_levels = defaultdict(list)
+        for level, keywords in self.enforcement_levels.items():
+            for keyword in keywords:
+                kw_to_levels[keyword].append(level)
+        self._kw_to_levels = {kw: tuple(levels) for kw, levels in kw_to_levels.items()}
+        
+        # 将全部关键词表预编译为单个自动机，一次扫描即可统计所有关键词
+        self.automaton = self._build_automaton()
+        
+        # 监管评分关键词按固定顺序展开为并行数组：分值、词频权重系数、权重上限
+        self._score_keywords = list(self.strict_keywords) + list(self.innovation_keywords)
+        self._keyword_scores = np.array(
+            list(self.strict_keywords.values()) + list(self.innovation_keywords.values()), dtype=np.float64)
+        self._weight_factors = np.array(
+            [2.0] * len(self.strict_keywords) + [1.5] * len(self.innovation_keywords))  # 创新词汇权重稍低
+        self._weight_caps = np.array(
+            [10.0] * len(self.strict_keywords) + [8.0] * len(self.innovation_keywords))
+        
+        # 同一政策在一次运行中会被多个分析流程重复分析，按(标题, 正文)缓存结果
+        self._analyze_text = lru_cache(maxsize=8192)(self._analyze_text_uncached)
+        
+    def _build_automaton(self) -> ahocorasick.Automaton:
+        """构建覆盖所有关键词表的Aho-Corasick自动机"""
+        keywords = set(self.strict_keywords) | set(self.innovation_keywords)
+        for keyword_list in self.domain_keywords.values():
+            keywords.update(keyword_list)
+        for keyword_list in self.enforcement_levels.values():
+            keywords.update(keyword_list)
+        
+        # 关键词以中文为主，仅少数英文词(如ChatGPT、AIGC)需要忽略大小写：
+        # 预先登记其所有大小写形式，扫描时无需再对全文做 lower()，命中结果统一记为小写关键词
+        automaton = ahocorasick.Automaton()
+        for keyword in keywords:
+            for variant in _case_variants(keyword):
+                automaton.add_word(variant, keyword.lower())
+        automaton.make_automaton()
+        return automaton
+    
+    def _scan(self, text: str) -> Counter:
+        """单次遍历文本(不区分英文大小写)，统计每个关键词(小写形式)的出现次数"""
+        return Counter(keyword for _, keyword in self.automaton.iter(text))
+    
     def calculate_regulatory_score(self, text: str) -> float:
         """
         计算监管态度评分 (1-10)
@@ -72,45 +157,40 @@ class PolicyAnalyzer:
         if not text:
             return 5.0
         
-        text = text.lower()
-        total_weight = 0
-        weighted_score = 0
-        
-        # 计算严格监管词汇得分
-        for keyword, score in self.strict_keywords.items():
-            count = text.count(keyword)
-            if count > 0:
-                weight = min(count * 2, 10)  # 词频权重，上限10
-                weighted_score += score * weight
-                total_weight += weight
-        
-        # 计算创新鼓励词汇得分
-        for keyword, score in self.innovation_keywords.items():
-            count = text.count(keyword)
-            if count > 0:
-                weight = min(count * 1.5, 8)  # 创新词汇权重稍低
-                weighted_score += score * weight
-                total_weight += weight
-        
-        if total_weight == 0:
-            return 5.0  # 中性评分
-        
-        # 计算加权平均
-        raw_score = weighted_score / total_weight
-        
-        # 归一化到1-10范围
-        return max(1.0, min(10.0, raw_score))
+        return self._regulatory_score(self._scan(text))
+    
+    def _regulatory_score(self, hits: Counter) -> float:
+        """根据关键词命中次数计算监管态度评分"""
+        counts = np.fromiter((hits[keyword] for keyword in self._score_keywords),
+                             dtype=np.float64, count=len(self._score_keywords))
+        return float(self._reduce_regulatory_scores(counts))
+    
+    def _reduce_regulatory_scores(self, counts: np.ndarray) -> np.ndarray:
+        """
+        由关键词词频数组计算监管评分，最后一维与 _score_keywords 对齐
+        词频权重 = min(词频 * 系数, 上限)，评分为分值的加权平均并归一化到1-10；未命中任何关键词时为中性评分5.0
+        """
+        weights = np.minimum(counts * self._weight_factors, self._weight_caps)
+        total_weight = weights.sum(axis=-1)
+        weighted_score = (weights * self._keyword_scores).sum(axis=-1)
+        
+        has_keywords = total_weight > 0
+        raw_score = weighted_score / np.where(has_keywords, total_weight, 1.0)
+        return np.where(has_keywords, np.clip(raw_score, 1.0, 10.0), 5.0)
     
     def identify_domains(self, text: str) -> List[str]:
         """识别涉及的领域"""
         if not text:
             return []
         
-        text = text.lower()
+        return self._identify_domains(self._scan(text))
+    
+    def _identify_domains(self, hits: Counter) -> List[str]:
+        """根据关键词命中次数识别涉及的领域"""
         identified_domains = []
         
         for domain, keywords in self.domain_keywords.items():
-            domain_score = sum(text.count(keyword.lower()) for keyword in keywords)
+            domain_score = sum(hits[keyword.lower()] for keyword in keywords)
             if domain_score >= 1:  # 至少出现1次相关词汇
                 identified_domains.append(domain)
         
@@ -118,41 +198,98 @@ class PolicyAnalyzer:
     
     def determine_enforcement_level(self, text: str, title: str = "") -> str:
         """确定强制程度"""
-        combined_text = f"{title} {text}".lower()
+        return self._enforcement_level(self._scan(f"{title} {text}"))
+    
+    def _enforcement_level(self, hits: Counter) -> str:
+        """根据关键词命中次数确定强制程度"""
+        # 只遍历命中的关键词，按反向索引累加各类型得分(保持类型定义顺序以决定并列时的结果)
+        level_scores = dict.fromkeys(self.enforcement_levels, 0)
+        for keyword, count in hits.items():
+            for level in self._kw_to_levels.get(keyword, ()):
+                level_scores[level] += count
         
-        level_scores = {}
-        for level, keywords in self.enforcement_levels.items():
-            score = sum(combined_text.count(keyword) for keyword in keywords)
-            if score > 0:
-                level_scores[level] = score
+        # 返回得分最高的类型，均未命中时视为指导性文件
+        level, score = max(level_scores.items(), key=itemgetter(1))
+        return level if score > 0 else "指导性文件"
+    
+    def analyze_policy(self, policy_data: Dict[str, Any], timestamp: Optional[str] = None) -> Dict[str, Any]:
+        """分析单个政策的多维度信息，timestamp 为空时使用当前时间"""
+        result = self._analyze_text(policy_data.get('title', ''), policy_data.get('full_text', ''))
+        analysis = result._asdict()
+        analysis['identified_domains'] = list(result.identified_domains)
+        analysis['analysis_timestamp'] = timestamp or datetime.now().isoformat()
+        return analysis
+    
+    def _analyze_text_uncached(self, title: str, content: str) -> PolicyAnalysis:
+        """分析政策标题与正文"""
+        combined_text = f"{title} {content}"
         
-        if not level_scores:
-            return "指导性文件"
+        # 只扫描一次文本，三个维度共享关键词命中结果
+        hits = self._scan(combined_text)
         
-        # 返回得分最高的类型
-        return max(level_scores.items(), key=lambda x: x[1])[0]
+        return PolicyAnalysis(
+            regulatory_score=self._regulatory_score(hits),
+            identified_domains=tuple(self._identify_domains(hits)),
+            enforcement_level=self._enforcement_level(hits),
+            content_length=len(content),
+            # 文本特征
+            has_penalties=any(word in combined_text for word in ['处罚', '罚款', '责任', '违法']),
+            has_deadlines=bool(_DEADLINE_RE.search(combined_text)),
+            urgency_indicators=len(_URGENCY_RE.findall(combined_text))
+        )
     
-    def analyze_policy(self, policy_data: Dict[str, Any]) -> Dict[str, Any]:
-        """分析单个政策的多维度信息"""
-        title = policy_data.get('title', '')
-        content = policy_data.get('full_text', '')
-        combined_text = f"{title} {content}"
+    def score_series(self, text_series: pd.Series) -> pd.DataFrame:
+        """
+        批量计算一列政策文本的分析指标(英文关键词不区分大小写)
+        每个关键词只调用一次向量化的 str.count，结果与 analyze_policy 逐行计算一致
+        """
+        def keyword_counts(keyword: str) -> np.ndarray:
+            return text_series.str.count(_keyword_pattern(keyword)).to_numpy(dtype=np.float64)
         
-        analysis = {
-            'regulatory_score': self.calculate_regulatory_score(combined_text),
-            'identified_domains': self.identify_domains(combined_text),
-            'enforcement_level': self.determine_enforcement_level(content, title),
-            'content_length': len(content),
-            'analysis_timestamp': datetime.now().isoformat()
-        }
+        regulatory_scores = self._reduce_regulatory_scores(np.column_stack(
+            [keyword_counts(keyword) for keyword in self._score_keywords]))
         
-        # 添加文本特征
-        analysis['has_penalties'] = any(word in combined_text.lower() 
-                                      for word in ['处罚', '罚款', '责任', '违法'])
-        analysis['has_deadlines'] = bool(re.search(r'\d{4}年\d{1,2}月', combined_text))
-        analysis['urgency_indicators'] = sum(combined_text.lower().count(word) 
-                                           for word in ['紧急', '立即', '尽快', '马上'])
+        # 领域：任一关键词出现即命中
+        domain_names = list(self.domain_keywords)
+        domain_hits = np.column_stack([
+            text_series.str.contains('|'.join(map(_keyword_pattern, keywords))).to_numpy(dtype=bool)
+            for keywords in self.domain_keywords.values()
+        ])
+        identified_domains = [
+            [domain for domain, hit in zip(domain_names, row) if hit] for row in domain_hits
+        ]
         
+        # 强制程度：取关键词总数最多的层级(并列时取靠前者)，均未命中则为指导性文件
+        level_names = list(self.enforcement_levels)
+        level_scores = np.column_stack([
+            sum(keyword_counts(kw) for kw in keywords)
+            for keywords in self.enforcement_levels.values()
+        ])
+        enforcement_levels = np.where(
+            level_scores.max(axis=1, initial=0) > 0,
+            np.array(level_names, dtype=object)[level_scores.argmax(axis=1)],
+            "指导性文件"
+        )
+        
+        return pd.DataFrame({
+            'regulatory_score': regulatory_scores,
+            'identified_domains': identified_domains,
+            'enforcement_level': enforcement_levels,
+            'has_penalties': text_series.str.contains('处罚|罚款|责任|违法').to_numpy(dtype=bool),
+            'has_deadlines': text_series.str.contains(_DEADLINE_RE).to_numpy(dtype=bool),
+            'urgency_indicators': text_series.str.count(_URGENCY_RE).to_numpy(dtype=np.int64),
+        }, index=text_series.index)
+    
+    def analyze_policies(self, policies: Union[pd.DataFrame, List[Dict[str, Any]]],
+                         timestamp: Optional[str] = None) -> pd.DataFrame:
+        """批量分析政策，返回与输入逐行对应、字段与 analyze_policy 相同的DataFrame，整批共用一个时间戳"""
+        df = _as_frame(policies)
+        title = _text_column(df, 'title')
+        content = _text_column(df, 'full_text')
+        
+        analysis = self.score_series(title + ' ' + content)
+        analysis.insert(3, 'content_length', content.str.len().to_numpy(dtype=np.int64))
+        analysis['analysis_timestamp'] = timestamp or datetime.now().isoformat()
         return analysis
 
 class PolicyTrendAnalyzer:
@@ -161,128 +298,111 @@ class PolicyTrendAnalyzer:
     def __init__(self):
         self.policy_analyzer = PolicyAnalyzer()
     
-    def analyze_temporal_trends(self, policies: List[Dict[str, Any]], 
+    def analyze_temporal_trends(self, policies: Union[pd.DataFrame, List[Dict[str, Any]]], 
                                time_window_months: int = 6) -> Dict[str, Any]:
         """分析时间趋势"""
+        df = _as_frame(policies)
+        
         # 过滤有日期的政策
-        dated_policies = [p for p in policies if p.get('publication_date')]
+        if 'publication_date' in df.columns:
+            dated_policies = df[df['publication_date'].notna() & (df['publication_date'] != '')]
+        else:
+            dated_policies = df.iloc[0:0]
         
-        if not dated_policies:
+        if dated_policies.empty:
             return {"error": "没有足够的时间数据进行趋势分析"}
         
-        # 按月分组
-        monthly_data = {}
-        for policy in dated_policies:
-            try:
-                date_str = policy['publication_date']
-                date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-                month_key = date_obj.strftime('%Y-%m')
-                
-                if month_key not in monthly_data:
-                    monthly_data[month_key] = []
-                monthly_data[month_key].append(policy)
-            except:
-                continue
-        
-        # 计算每月的监管情绪
-        monthly_sentiment = {}
-        for month, month_policies in monthly_data.items():
-            scores = []
-            for policy in month_policies:
-                analysis = self.policy_analyzer.analyze_policy(policy)
-                scores.append(analysis['regulatory_score'])
-            
-            if scores:
-                monthly_sentiment[month] = {
-                    'avg_regulatory_score': np.mean(scores),
-                    'policy_count': len(scores),
-                    'max_score': max(scores),
-                    'min_score': min(scores)
-                }
+        # 按月分组(无法解析的日期不参与分组)，计算每月的监管情绪
+        publication_dates = dated_policies['publication_date']
+        months = pd.to_datetime(publication_dates, format='%Y-%m-%d', errors='coerce').dt.to_period('M')
+        scores = self.policy_analyzer.analyze_policies(dated_policies)['regulatory_score']
+        monthly_sentiment = scores.groupby(months).agg(
+            avg_regulatory_score='mean',
+            policy_count='count',
+            max_score='max',
+            min_score='min'
+        )
+        monthly_sentiment.index = monthly_sentiment.index.astype(str)
         
         return {
-            'monthly_sentiment': monthly_sentiment,
+            'monthly_sentiment': monthly_sentiment.to_dict('index'),
             'total_analyzed_policies': len(dated_policies),
             'date_range': {
-                'earliest': min(p['publication_date'] for p in dated_policies),
-                'latest': max(p['publication_date'] for p in dated_policies)
+                'earliest': publication_dates.min(),
+                'latest': publication_dates.max()
             }
         }
     
-    def department_analysis(self, policies: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def department_analysis(self, policies: Union[pd.DataFrame, List[Dict[str, Any]]]) -> Dict[str, Any]:
         """按部门分析政策分布"""
-        dept_stats = {}
+        df = _as_frame(policies)
+        analysis = self.policy_analyzer.analyze_policies(df)
+        if 'issuing_department' in df.columns:
+            departments = df['issuing_department'].fillna('未知部门')
+        else:
+            departments = pd.Series('未知部门', index=df.index)
         
-        for policy in policies:
-            dept = policy.get('issuing_department', '未知部门')
-            if dept not in dept_stats:
-                dept_stats[dept] = {
-                    'count': 0,
-                    'regulatory_scores': [],
-                    'domains': []
-                }
-            
-            dept_stats[dept]['count'] += 1
-            
-            # 分析该政策
-            analysis = self.policy_analyzer.analyze_policy(policy)
-            dept_stats[dept]['regulatory_scores'].append(analysis['regulatory_score'])
-            dept_stats[dept]['domains'].extend(analysis['identified_domains'])
-        
-        # 计算统计指标
-        for dept, stats in dept_stats.items():
-            if stats['regulatory_scores']:
-                stats['avg_regulatory_score'] = np.mean(stats['regulatory_scores'])
-                stats['regulatory_intensity'] = len([s for s in stats['regulatory_scores'] if s > 7])
-            
-            # 统计最常涉及的领域
-            domain_counts = {}
-            for domain in stats['domains']:
-                domain_counts[domain] = domain_counts.get(domain, 0) + 1
-            stats['top_domains'] = sorted(domain_counts.items(), 
-                                        key=lambda x: x[1], reverse=True)[:3]
-            
-            # 清理临时数据
-            del stats['regulatory_scores']
-            del stats['domains']
+        # 按部门收集行号，统计量直接在分数数组的切片上计算
+        dept_indices = defaultdict(list)
+        for i, dept in enumerate(departments):
+            dept_indices[dept].append(i)
+        
+        scores = analysis['regulatory_score'].to_numpy()
+        domains_list = analysis['identified_domains'].tolist()
+        
+        dept_stats = {}
+        for dept, idx in dept_indices.items():
+            dept_scores = scores[idx]
+            dept_stats[dept] = {
+                'count': len(idx),
+                'avg_regulatory_score': dept_scores.mean(),
+                'regulatory_intensity': int((dept_scores > 7).sum()),
+                # 统计最常涉及的领域
+                'top_domains': Counter(chain.from_iterable(domains_list[i] for i in idx)).most_common(3)
+            }
         
         return dept_stats
     
-    def generate_risk_alerts(self, policies: List[Dict[str, Any]], 
-                           threshold: float = 8.0) -> List[Dict[str, Any]]:
-        """生成风险预警"""
-        alerts = []
+    def generate_risk_alerts(self, policies: Union[pd.DataFrame, List[Dict[str, Any]]], 
+                           threshold: float = 8.0, top_k: Optional[int] = None,
+                           timestamp: Optional[str] = None) -> List[Dict[str, Any]]:
+        """生成风险预警，指定 top_k 时只返回评分最高的 top_k 条；同一批预警共用一个时间戳"""
+        timestamp = timestamp or datetime.now().isoformat()
+        df = _as_frame(policies)
+        analysis = self.policy_analyzer.analyze_policies(df, timestamp)
+        flagged = (analysis['regulatory_score'] >= threshold).to_numpy()
         
-        for policy in policies:
-            analysis = self.policy_analyzer.analyze_policy(policy)
+        alerts = []
+        for policy, result in zip(df[flagged].to_dict('records'), 
+                                  analysis[flagged].to_dict('records')):
+            alert = {
+                'title': policy.get('title', 'N/A'),
+                'url': policy.get('url', ''),
+                'regulatory_score': result['regulatory_score'],
+                'department': policy.get('issuing_department', '未知'),
+                'publication_date': policy.get('publication_date', 'N/A'),
+                'risk_factors': [],
+                'affected_domains': result['identified_domains'],
+                'alert_timestamp': timestamp
+            }
+            
+            # 识别风险因素
+            if result['has_penalties']:
+                alert['risk_factors'].append('包含处罚条款')
+            if result['has_deadlines']:
+                alert['risk_factors'].append('设定时间期限')
+            if result['urgency_indicators'] > 0:
+                alert['risk_factors'].append('存在紧急性指标')
+            if result['enforcement_level'] in ['法律法规', '行政规章']:
+                alert['risk_factors'].append('强制执行级别高')
             
-            if analysis['regulatory_score'] >= threshold:
-                alert = {
-                    'title': policy.get('title', 'N/A'),
-                    'url': policy.get('url', ''),
-                    'regulatory_score': analysis['regulatory_score'],
-                    'department': policy.get('issuing_department', '未知'),
-                    'publication_date': policy.get('publication_date', 'N/A'),
-                    'risk_factors': [],
-                    'affected_domains': analysis['identified_domains'],
-                    'alert_timestamp': datetime.now().isoformat()
-                }
-                
-                # 识别风险因素
-                if analysis['has_penalties']:
-                    alert['risk_factors'].append('包含处罚条款')
-                if analysis['has_deadlines']:
-                    alert['risk_factors'].append('设定时间期限')
-                if analysis['urgency_indicators'] > 0:
-                    alert['risk_factors'].append('存在紧急性指标')
-                if analysis['enforcement_level'] in ['法律法规', '行政规章']:
-                    alert['risk_factors'].append('强制执行级别高')
-                
-                alerts.append(alert)
+            alerts.append(alert)
         
         # 按监管分数排序
-        alerts.sort(key=lambda x: x['regulatory_score'], reverse=True)
-        return alerts
+        by_score = itemgetter('regulatory_score')
+        if top_k:
+            return heapq.nlargest(top_k, alerts, key=by_score)
+        return sorted(alerts, key=by_score, reverse=True)
 
 def main():
     """测试函数"""
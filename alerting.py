@@ -3,25 +3,124 @@
 预警与报告模块
 实现PRD中的预警与报告功能 (Alerting & Reporting)
 """
+import heapq
 import smtplib
-import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from email.mime.text import MimeText
-from email.mime.multipart import MimeMultipart
-from email.mime.base import MimeBase
-from email import encoders
+from email.message import EmailMessage
+from itertools import chain
+from operator import itemgetter
 import pandas as pd
-from typing import Dict, List, Any, Optional
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Union
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 
+import orjson
+
 from ai_analysis import PolicyAnalyzer, PolicyTrendAnalyzer
 
 # 设置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# JSON输出选项：缩进2格，numpy标量原生序列化，其余类型(如datetime)回退为字符串
+JSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+
+# 预警检查所需的政策字段，加载CSV时只读取这些列
+NEEDED_COLUMNS = ['title', 'full_text', 'publication_date', 'issuing_department', 'url']
+
+# 流式预警检查时每次读取的CSV块大小(字节)，峰值内存与块大小而非语料规模成正比
+STREAM_BLOCK_SIZE = 16 << 20
+
+# 预警报告模板，整份报告只做一次拼接
+REPORT_HEADER_TEMPLATE = (
+    "🚨 AI政策风险预警报告\n"
+    "📅 生成时间: {generated_at}\n"
+    "⚡ 预警数量: {count}\n"
+    + "=" * 50
+)
+ALERT_BLOCK_TEMPLATE = (
+    "\n📋 预警 {index}: {title}\n"
+    "🏛️  发布部门: {department}\n"
+    "📅 发布日期: {publication_date}\n"
+    "⭐ 监管评分: {regulatory_score:.1f}/10\n"
+    "🎯 涉及领域: {domains}\n"
+    "⚠️  风险因素: {risks}\n"
+    "🔗 链接: {url}\n"
+    + "-" * 40
+)
+REPORT_FOOTER = (
+    "\n💡 建议行动:\n"
+    "1. 评估政策对现有业务的影响\n"
+    "2. 与法务部门确认合规要求\n"
+    "3. 制定相应的应对措施\n"
+    "4. 持续监控政策实施细则"
+)
+
+def _csv_options() -> Dict[str, Any]:
+    """政策CSV的Arrow解析选项：只保留预警所需字段(缺失的字段补空列)，全部按字符串读取"""
+    return {
+        'convert_options': pacsv.ConvertOptions(
+            include_columns=NEEDED_COLUMNS,
+            include_missing_columns=True,
+            column_types={col: pa.string() for col in NEEDED_COLUMNS}
+        ),
+        # 正文字段中含有换行符，需允许引号内换行
+        'parse_options': pacsv.ParseOptions(newlines_in_values=True),
+    }
+
+def _read_policy_table(csv_file: str) -> Optional[pa.Table]:
+    """以列式Arrow表读取单个政策CSV"""
+    try:
+        return pacsv.read_csv(csv_file, **_csv_options())
+    except Exception as e:
+        logger.error(f"加载政策数据失败 {csv_file}: {e}")
+        return None
+
+def load_policies(csv_files: List[str]) -> Optional[pd.DataFrame]:
+    """按列读取政策CSV并合并为一个DataFrame，没有可用数据时返回None"""
+    existing_files = [f for f in csv_files if os.path.exists(f)]
+    if not existing_files:
+        return None
+    
+    # 各文件相互独立，读取时不持有GIL，并行加载
+    max_workers = min(len(existing_files), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        tables = [t for t in executor.map(_read_policy_table, existing_files) if t is not None]
+    
+    if not tables:
+        return None
+    
+    # 在Arrow层按列拼接(不复制数据)，最后只转换一次为pandas
+    combined = pa.concat_tables(tables, promote_options='default')
+    df = combined.to_pandas(self_destruct=True, split_blocks=True).fillna('')
+    
+    # 同一政策会在多次抓取的快照中重复出现：按URL去重(保留最新一条)，无URL时按标题+发布日期
+    dedup_key = df['url'].where(df['url'] != '', df['title'] + '|' + df['publication_date'])
+    num_before_dedup = len(df)
+    df = df[~dedup_key.duplicated(keep='last')].reset_index(drop=True)
+    logger.info(f"政策去重: {num_before_dedup} -> {len(df)}")
+    return df
+
+def iter_policy_chunks(csv_files: List[str], block_size: int = STREAM_BLOCK_SIZE) -> Iterator[pd.DataFrame]:
+    """逐块读取政策CSV，每次产出一个DataFrame；读取失败的文件记录错误后跳过"""
+    read_options = pacsv.ReadOptions(block_size=block_size)
+    for csv_file in csv_files:
+        if not os.path.exists(csv_file):
+            continue
+        try:
+            with pacsv.open_csv(csv_file, read_options=read_options, **_csv_options()) as reader:
+                for batch in reader:
+                    if batch.num_rows:
+                        yield batch.to_pandas().fillna('')
+        except Exception as e:
+            logger.error(f"加载政策数据失败 {csv_file}: {e}")
+
 class AlertingConfig:
     """预警配置类"""
     
@@ -57,8 +156,8 @@ class AlertingConfig:
         """加载配置"""
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                with open(self.config_file, 'rb') as f:
+                    return orjson.loads(f.read())
             except Exception as e:
                 logger.warning(f"加载配置失败: {e}, 使用默认配置")
         
@@ -67,8 +166,8 @@ class AlertingConfig:
     def save_config(self):
         """保存配置"""
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, ensure_ascii=False, indent=2)
+            with open(self.config_file, 'wb') as f:
+                f.write(orjson.dumps(self.config, default=str, option=JSON_OPTIONS))
         except Exception as e:
             logger.error(f"保存配置失败: {e}")
     
@@ -85,21 +184,60 @@ class PolicyAlerter:
         self.policy_analyzer = PolicyAnalyzer()
         self.trend_analyzer = PolicyTrendAnalyzer()
         
+        # 复用HTTP长连接发送Webhook，避免每次预警重新建立TCP+TLS连接
+        self._http = requests.Session()
+        self._http.headers['Connection'] = 'keep-alive'
+        self._http.mount('https://', HTTPAdapter(
+            pool_connections=4, pool_maxsize=4,
+            max_retries=Retry(total=2, backoff_factor=0.2)
+        ))
+        
         # 创建输出目录
         self.output_dir = "alerts_output"
         os.makedirs(self.output_dir, exist_ok=True)
     
-    def check_high_risk_policies(self, policies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def check_high_risk_policies(self, policies: Union[pd.DataFrame, List[Dict[str, Any]]],
+                                 timestamp: Optional[str] = None) -> List[Dict[str, Any]]:
         """检查高风险政策"""
         threshold = self.config.config.get("alert_threshold", 8.0)
-        high_risk_policies = self.trend_analyzer.generate_risk_alerts(policies, threshold)
-        
+        high_risk_policies = self.trend_analyzer.generate_risk_alerts(policies, threshold, timestamp=timestamp)
+        return self._filter_alerts(high_risk_policies)
+    
+    def check_high_risk_policies_stream(self, chunks: Iterable[pd.DataFrame], 
+                                        timestamp: Optional[str] = None,
+                                        top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        逐块检查高风险政策，内存中只保留超过阈值的预警而非全部政策
+        各块预警已按评分降序排列，归并后统一去重过滤；指定 top_k 时只返回评分最高的 top_k 条
+        """
+        threshold = self.config.config.get("alert_threshold", 8.0)
+        num_policies = 0
+        chunk_alerts = []
+        for chunk in chunks:
+            num_policies += len(chunk)
+            chunk_alerts.append(self.trend_analyzer.generate_risk_alerts(chunk, threshold, timestamp=timestamp))
+        logger.info(f"流式检查政策 {num_policies} 条")
+        
+        merged = heapq.merge(*chunk_alerts, key=itemgetter('regulatory_score'), reverse=True)
+        return self._filter_alerts(merged, top_k)
+    
+    def _filter_alerts(self, high_risk_policies: Iterable[Dict[str, Any]], 
+                       top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """按链接(无链接时按标题+发布日期)去重并应用部门、领域过滤，输入需已按评分降序排列"""
         # 额外过滤：只关注特定部门和领域
         monitored_departments = self.config.config.get("departments_to_monitor", [])
         monitored_domains = self.config.config.get("domains_to_monitor", [])
         
         filtered_alerts = []
+        seen_keys = set()
         for alert in high_risk_policies:
+            # 同一政策只预警一次(预警已按评分降序排列，保留评分最高的一条)；
+            # 与 load_policies 的去重键一致：优先按链接，无链接时按标题+发布日期
+            key = alert.get('url') or f"{alert.get('title', '')}|{alert.get('publication_date', '')}"
+            if key in seen_keys:
+                continue
+            seen_keys.add(key)
+            
             # 部门过滤
             if monitored_departments and alert.get('department') not in monitored_departments:
                 continue
@@ -111,6 +249,8 @@ class PolicyAlerter:
                     continue
             
             filtered_alerts.append(alert)
+            if top_k and len(filtered_alerts) >= top_k:
+                break
         
         return filtered_alerts
     
@@ -119,37 +259,39 @@ class PolicyAlerter:
         if not alerts:
             return "当前没有高风险政策预警。"
         
-        report_lines = [
-            "🚨 AI政策风险预警报告",
-            f"📅 生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-            f"⚡ 预警数量: {len(alerts)}",
-            "=" * 50
-        ]
-        
-        for i, alert in enumerate(alerts, 1):
-            report_lines.extend([
-                f"\n📋 预警 {i}: {alert['title']}",
-                f"🏛️  发布部门: {alert['department']}",
-                f"📅 发布日期: {alert['publication_date']}",
-                f"⭐ 监管评分: {alert['regulatory_score']:.1f}/10",
-                f"🎯 涉及领域: {', '.join(alert['affected_domains'])}",
-                f"⚠️  风险因素: {', '.join(alert['risk_factors'])}",
-                f"🔗 链接: {alert['url']}",
-                "-" * 40
-            ])
-        
-        report_lines.extend([
-            "\n💡 建议行动:",
-            "1. 评估政策对现有业务的影响",
-            "2. 与法务部门确认合规要求", 
-            "3. 制定相应的应对措施",
-            "4. 持续监控政策实施细则"
-        ])
-        
-        return '\n'.join(report_lines)
+        header = REPORT_HEADER_TEMPLATE.format(
+            generated_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            count=len(alerts)
+        )
+        body = '\n'.join(
+            ALERT_BLOCK_TEMPLATE.format_map({
+                **alert,
+                'index': i,
+                'domains': ', '.join(alert['affected_domains']),
+                'risks': ', '.join(alert['risk_factors'])
+            })
+            for i, alert in enumerate(alerts, 1)
+        )
+        
+        return '\n'.join((header, body, REPORT_FOOTER))
+    
+    def open_smtp_connection(self) -> smtplib.SMTP:
+        """建立已完成TLS握手和登录的SMTP连接，批量发送多份报告时可复用"""
+        email_config = self.config.config.get("email", {})
+        server = smtplib.SMTP(email_config.get("smtp_server", ""), 
+                              email_config.get("smtp_port", 587))
+        try:
+            server.starttls()
+            server.login(email_config.get("username", ""), 
+                         email_config.get("password", ""))
+        except Exception:
+            server.close()
+            raise
+        return server
     
-    def send_email_alert(self, alert_report: str, alerts: List[Dict[str, Any]]):
-        """发送邮件预警"""
+    def send_email_alert(self, alert_report: str, alerts: List[Dict[str, Any]], 
+                         server: Optional[smtplib.SMTP] = None):
+        """发送邮件预警，传入 server 时复用已有连接"""
         email_config = self.config.config.get("email", {})
         
         if not email_config.get("enabled", False):
@@ -162,25 +304,18 @@ class PolicyAlerter:
         
         try:
             # 创建邮件
-            msg = MimeMultipart()
+            msg = EmailMessage()
             msg['From'] = email_config.get("username", "")
             msg['To'] = ", ".join(email_config.get("recipients", []))
             msg['Subject'] = f"AI政策风险预警 - {len(alerts)}个高风险政策 ({datetime.now().strftime('%Y-%m-%d')})"
-            
-            # 添加正文
-            msg.attach(MimeText(alert_report, 'plain', 'utf-8'))
+            msg.set_content(alert_report)
             
             # 连接SMTP服务器并发送
-            server = smtplib.SMTP(email_config.get("smtp_server", ""), 
-                                email_config.get("smtp_port", 587))
-            server.starttls()
-            server.login(email_config.get("username", ""), 
-                        email_config.get("password", ""))
-            
-            text = msg.as_string()
-            server.sendmail(email_config.get("username", ""), 
-                          email_config.get("recipients", []), text)
-            server.quit()
+            if server is not None:
+                server.send_message(msg)
+            else:
+                with self.open_smtp_connection() as server:
+                    server.send_message(msg)
             
             logger.info(f"邮件预警已发送至 {len(email_config.get('recipients', []))} 个接收者")
             return True
@@ -235,7 +370,7 @@ class PolicyAlerter:
                 })
             
             # 发送到Slack
-            response = requests.post(webhook_url, json=slack_message, timeout=10)
+            response = self._http.post(webhook_url, json=slack_message, timeout=10)
             response.raise_for_status()
             
             logger.info("Slack预警已发送")
@@ -251,13 +386,13 @@ class PolicyAlerter:
         
         # 保存详细的预警数据
         alert_file = os.path.join(self.output_dir, f"alerts_{timestamp}.json")
-        with open(alert_file, 'w', encoding='utf-8') as f:
-            json.dump({
+        with open(alert_file, 'wb') as f:
+            f.write(orjson.dumps({
                 "timestamp": datetime.now().isoformat(),
                 "alert_count": len(alerts),
                 "threshold": self.config.config.get("alert_threshold", 8.0),
                 "alerts": alerts
-            }, f, ensure_ascii=False, indent=2)
+            }, default=str, option=JSON_OPTIONS))
         
         # 保存报告文本
         report_file = os.path.join(self.output_dir, f"alert_report_{timestamp}.txt")
@@ -267,13 +402,27 @@ class PolicyAlerter:
         logger.info(f"预警日志已保存: {alert_file}, {report_file}")
         return alert_file, report_file
     
-    def run_alert_check(self, policies: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def run_alert_check(self, policies: Union[pd.DataFrame, List[Dict[str, Any]]]) -> Dict[str, Any]:
         """执行预警检查"""
         logger.info("开始执行政策风险预警检查...")
+        # 本次检查的所有分析结果与预警共用同一时间戳
+        timestamp = datetime.now().isoformat()
         
         # 检查高风险政策
-        alerts = self.check_high_risk_policies(policies)
-        
+        alerts = self.check_high_risk_policies(policies, timestamp)
+        return self._report_alerts(alerts, timestamp)
+    
+    def run_alert_check_stream(self, chunks: Iterable[pd.DataFrame], 
+                               top_k: Optional[int] = None) -> Dict[str, Any]:
+        """逐块读取政策并执行预警检查，适用于无法一次载入内存的大规模语料"""
+        logger.info("开始执行政策风险预警检查(流式)...")
+        timestamp = datetime.now().isoformat()
+        
+        alerts = self.check_high_risk_policies_stream(chunks, timestamp, top_k)
+        return self._report_alerts(alerts, timestamp)
+    
+    def _report_alerts(self, alerts: List[Dict[str, Any]], timestamp: str) -> Dict[str, Any]:
+        """生成预警报告、保存日志并发送通知"""
         # 生成报告
         alert_report = self.generate_alert_report(alerts)
         
@@ -296,7 +445,7 @@ class PolicyAlerter:
             "report": alert_report,
             "log_files": log_files,
             "notifications": notification_results,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": timestamp
         }
         
         logger.info(f"预警检查完成，发现 {len(alerts)} 个高风险政策")
@@ -317,8 +466,8 @@ class AlertScheduler:
             return True
         
         try:
-            with open(self.last_check_file, 'r') as f:
-                last_check_data = json.load(f)
+            with open(self.last_check_file, 'rb') as f:
+                last_check_data = orjson.loads(f.read())
                 last_check_time = datetime.fromisoformat(last_check_data["timestamp"])
         except:
             return True
@@ -337,10 +486,10 @@ class AlertScheduler:
     def update_last_check(self):
         """更新最后检查时间"""
         try:
-            with open(self.last_check_file, 'w') as f:
-                json.dump({
+            with open(self.last_check_file, 'wb') as f:
+                f.write(orjson.dumps({
                     "timestamp": datetime.now().isoformat()
-                }, f)
+                }))
         except Exception as e:
             logger.error(f"更新检查时间失败: {e}")
     
@@ -350,23 +499,18 @@ class AlertScheduler:
             logger.info("未到检查时间，跳过预警检查")
             return
         
-        # 加载政策数据
-        all_policies = []
-        for csv_file in csv_files:
-            if os.path.exists(csv_file):
-                try:
-                    df = pd.read_csv(csv_file)
-                    policies = df.to_dict('records')
-                    all_policies.extend(policies)
-                except Exception as e:
-                    logger.error(f"加载政策数据失败 {csv_file}: {e}")
-        
-        if not all_policies:
+        existing_files = [f for f in csv_files if os.path.exists(f)]
+        if not existing_files:
             logger.warning("没有找到政策数据，跳过预警检查")
             return
         
-        # 执行预警检查
-        result = self.alerter.run_alert_check(all_policies)
+        # 逐块读取并执行预警检查，不将全部政策载入内存；一块数据都读不到时跳过本次检查
+        chunks = iter_policy_chunks(existing_files)
+        first_chunk = next(chunks, None)
+        if first_chunk is None:
+            logger.warning("政策数据为空或无法读取，跳过预警检查")
+            return
+        result = self.alerter.run_alert_check_stream(chain([first_chunk], chunks))
         
         # 更新检查时间
         self.update_last_check()
@@ -391,12 +535,11 @@ def main():
         return
     
     # 加载政策数据进行测试
-    all_policies = []
-    for csv_file in existing_files:
-        df = pd.read_csv(csv_file)
-        policies = df.to_dict('records')
-        all_policies.extend(policies)
-        print(f"已加载: {csv_file} ({len(policies)} 条记录)")
+    all_policies = load_policies(existing_files)
+    if all_policies is None:
+        print("政策数据为空或无法读取，请检查数据文件")
+        return
+    print(f"已加载: {', '.join(existing_files)} ({len(all_policies)} 条记录)")
     
     # 执行预警检查
     result = alerter.run_alert_check(all_policies)
@@ -2,88 +2,198 @@
 """
 网信办政策爬虫 - 独立版本 (Simplified for central filtering)
 """
+import csv
+import os
 import re
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Tuple, Dict, Any
+from functools import lru_cache
+from typing import Iterator, List, Optional, Set, Tuple, Dict, Any
 from bs4 import BeautifulSoup
+import soupsieve as sv
+import lxml.html
+from lxml import etree
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 import random
 import logging
+import ahocorasick
 from urllib.parse import urljoin
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+OUTPUT_COLUMNS = ['title', 'url', 'publication_date', 'issuing_department', 'full_text']
+# Article bodies can exceed the csv module's default 128 KB field limit
+csv.field_size_limit(2**31 - 1)
+
+# Patterns are compiled once at import time and shared by every article.
+_WS_RE = re.compile(r'\s+')
+# A date, optionally labelled "发布日期".
+_DATE_RE = re.compile(r'(?:发布日期[:：\s]*)?(?P<date>\d{4}[-/年]\d{1,2}[-/月]\d{1,2})日?')
+_DATE_TRANS = str.maketrans({'年': '-', '月': '-', '/': '-'})
+# Department: either the CAC's own name at the very start of the text, or the first
+# labelled department field. Labels are located with a single Aho-Corasick pass and the
+# value is then matched in place.
+_STATE_PREFIX = '中华人民共和国'
+_CAC_NAMES = ('国家互联网信息办公室', '国家网信办')
+_DEPT_VALUE_RE = re.compile(r'[:：\s]*(.*?)(?:\n|$|\s{2,})')
+
+
+def _build_dept_label_automaton() -> ahocorasick.Automaton:
+    automaton = ahocorasick.Automaton()
+    for label in ('发文机关', '发布单位', '发布部门'):
+        automaton.add_word(label, label)
+    automaton.make_automaton()
+    return automaton
+
+
+_DEPT_LABEL_AC = _build_dept_label_automaton()
+
+
+@lru_cache(maxsize=1024)
+def _normalize_date(date_str: str) -> Optional[str]:
+    """Normalizes a matched date to YYYY-MM-DD, or None if it is not a valid date.
+
+    Cached because articles in the same listing often share a publication date.
+    """
+    try:
+        return datetime.strptime(date_str.translate(_DATE_TRANS), '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+# CSS selectors used on every list page, compiled once.
+_LIST_CONTAINER_SEL = sv.compile('#loadingInfoPage')
+_LIST_LINK_SEL = sv.compile('li h5 a')
+# Rendered article links on a list page, as seen by the browser.
+_LIST_LINK_CSS = "#loadingInfoPage li a"
+
+
+class _ListRendered:
+    """WebDriverWait condition: the rendered article list has stopped growing.
+
+    Settles after a few unchanged polls once the list is at least as long as a previous
+    full page, and after a longer quiet period otherwise (e.g. a short last page).
+    """
+
+    def __init__(self, expected_min: int, quick_polls: int = 2, slow_polls: int = 8):
+        self.expected_min = expected_min
+        self.quick_polls = quick_polls
+        self.slow_polls = slow_polls
+        self.last_count = -1
+        self.unchanged_polls = 0
+
+    def __call__(self, driver):
+        count = len(driver.find_elements(By.CSS_SELECTOR, _LIST_LINK_CSS))
+        if count != self.last_count:
+            self.last_count, self.unchanged_polls = count, 0
+            return False
+        self.unchanged_polls += 1
+        needed = self.quick_polls if count >= self.expected_min else self.slow_polls
+        return count if count and self.unchanged_polls >= needed else False
+
+
+def _has_class(name: str) -> str:
+    """XPath predicate equivalent to the CSS class selector `.name`."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Compiled XPath equivalents of the article selectors; a union indexed with [1] picks
+# the first match in document order, like BeautifulSoup's select_one.
+_TITLE_XPATH = etree.XPath(f"(//h1 | //*[{_has_class('article_title')}])[1]")
+_CONTENT_XPATH = etree.XPath(f"(//*[@id='content'] | //*[{_has_class('TRS_Editor')}]"
+                             f" | //*[{_has_class('article_content')}] | //*[{_has_class('content')}])[1]")
+_META_XPATH = etree.XPath(f"(//*[{_has_class('article_info')}] | //*[{_has_class('pages-date')}]"
+                          f" | //*[{_has_class('article-inf')}])[1]")
+
+
+def _node_text(node, separator: str = '') -> str:
+    """Joins the stripped, non-empty text pieces under a node (like BeautifulSoup's get_text(strip=True))."""
+    return separator.join(piece for piece in map(str.strip, node.itertext()) if piece)
+
+
+def _first(nodes):
+    return nodes[0] if nodes else None
+
 class CACPolicyScraper:
     """网信办政策爬虫"""
 
-    def __init__(self, max_pages=10):
+    def __init__(self, max_pages=10, max_workers=8):
         self.base_url = "https://www.cac.gov.cn"
         self.list_path = "/wxzw/wxfb/"
         self.max_pages = max_pages
+        self.max_workers = max_workers
+        # Articles already saved by a previous run; they are not downloaded again
+        self.known_urls: Set[str] = set()
         self.delay_range = (1.0, 3.0)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
         }
         self.session = requests.Session()
         self.session.headers.update(self.headers)
+        # Keep-alive connection pool so article fetches reuse TCP+TLS connections;
+        # transient failures are retried by urllib3 with exponential backoff.
+        # The session is shared by all article-fetching worker threads (as in the MIIT and
+        # TC260 scrapers); its pool is sized above max_workers so no thread waits for a socket.
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504]),
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.driver = None
 
-    def safe_request(self, url, retries=3, delay_range=(1, 3)):
-        """Robustly makes an HTTP GET request with retries and delays."""
-        for i in range(retries):
-            try:
-                time.sleep(random.uniform(*delay_range))
-                response = self.session.get(url, timeout=20)
-                response.raise_for_status()
-                response.encoding = response.apparent_encoding
-                return response
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Error fetching {url} (Attempt {i+1}/{retries}): {e}")
-                if i < retries - 1:
-                    time.sleep(delay_range[1] * (i + 1))
-        return None
+    def safe_request(self, url, delay_range=(1, 3)):
+        """Makes a polite HTTP GET request; retries are handled by the session adapter."""
+        time.sleep(random.uniform(*delay_range))
+        try:
+            response = self.session.get(url, timeout=20)
+            response.raise_for_status()
+            response.encoding = response.apparent_encoding
+            return response
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error fetching {url}: {e}")
+            return None
 
     def clean_text(self, text: str) -> str:
         """Cleans text by removing excessive whitespace."""
-        return re.sub(r'\s+', ' ', text).strip()
+        return _WS_RE.sub(' ', text).strip()
 
     def extract_date_from_text(self, text: str) -> str:
         """Attempts to extract a date from text using common patterns."""
-        date_patterns = [
-            r'(\d{4}[-/年]\d{1,2}[-/月]\d{1,2})日?',
-            r'发布日期[:：\s]*(\d{4}[-/年]\d{1,2}[-/月]\d{1,2})',
-        ]
-        for pattern in date_patterns:
-            match = re.search(pattern, text)
-            if match:
-                date_str = match.group(1).replace('年', '-').replace('月', '-').replace('/', '-')
-                try:
-                    return datetime.strptime(date_str, '%Y-%m-%d').strftime('%Y-%m-%d')
-                except ValueError:
-                    pass
+        for match in _DATE_RE.finditer(text):
+            date = _normalize_date(match.group('date'))
+            if date:
+                return date
         return None
 
     def extract_department_from_text(self, text: str) -> str:
         """Attempts to extract an issuing department from text."""
-        dept_patterns = [
-            r'^(?:中华人民共和国)?(国家互联网信息办公室|国家网信办)',
-            r'(?:发文机关|发布单位|发布部门)[:：\s]*(.*?)(?:\n|$|\s{2,})'
-        ]
-        for pattern in dept_patterns:
-            match = re.search(pattern, text)
-            if match:
-                department = match.group(1).strip()
-                if department and 3 <= len(department) <= 30:
-                    return department
+        offset = len(_STATE_PREFIX) if text.startswith(_STATE_PREFIX) else 0
+        for name in _CAC_NAMES:
+            if text.startswith(name, offset):
+                return name
+        
+        # Only the first labelled field is considered
+        for end_index, _ in _DEPT_LABEL_AC.iter(text):
+            department = _DEPT_VALUE_RE.match(text, end_index + 1).group(1).strip()
+            if department and 3 <= len(department) <= 30:
+                return department
+            break
         return self.get_default_department()
 
     def get_list_url(self, page_num: int) -> str:
@@ -95,11 +205,12 @@ class CACPolicyScraper:
     def extract_article_links(self, soup: BeautifulSoup) -> List[Tuple[str, str]]:
         """从列表页提取文章链接"""
         links = []
-        list_container = soup.select_one('#loadingInfoPage')
+        seen = set()
+        list_container = _LIST_CONTAINER_SEL.select_one(soup)
         if not list_container:
             return []
             
-        all_links = list_container.select('li h5 a')
+        all_links = _LIST_LINK_SEL.select(list_container)
         
         for link in all_links:
             href = link.get('href', '')
@@ -109,31 +220,43 @@ class CACPolicyScraper:
             full_url = urljoin(self.base_url, href)
             if any(skip in full_url.lower() for skip in ['javascript:', '#', '.pdf', '.doc', '.xls', '.zip']): continue
             
+            if (full_url, text) in seen: continue
+            seen.add((full_url, text))
             links.append((full_url, text))
         
-        unique_links = list(dict.fromkeys(links))
-        return unique_links
+        return links
 
     def extract_article_content(self, url: str) -> Dict[str, Any]:
         """提取文章详细内容"""
         logger.info(f"  Scraping details from: {url}")
         response = self.safe_request(url)
         if not response: return {}
+        return self._parse_article(response.content, url)
+
+    def _parse_article(self, content: bytes, url: str) -> Dict[str, Any]:
+        """Parses a fetched article page into a policy record."""
+        # lxml parsers are not thread-safe, so each call (worker thread) builds its own.
+        parser = lxml.html.HTMLParser(encoding='utf-8')
+        try:
+            tree = lxml.html.document_fromstring(content, parser=parser)
+        except etree.ParserError as e:
+            logger.error(f"Error parsing {url}: {e}")
+            return {}
         
-        soup = BeautifulSoup(response.content, 'html.parser', from_encoding='utf-8')
-        
-        for element in soup(['script', 'style']):
-            element.decompose()
+        etree.strip_elements(tree, 'script', 'style', etree.Comment, with_tail=False)
         
-        title = soup.select_one('h1, .article_title')
-        title_text = title.get_text(strip=True) if title else 'N/A'
+        # Pages without a recognised article body are not policies (index pages, notices, etc.)
+        content_elem = _first(_CONTENT_XPATH(tree))
+        if content_elem is None:
+            logger.warning(f"No article body found at {url}; skipping.")
+            return {}
+        content = self.clean_text(_node_text(content_elem, '\n'))
         
-        content_elem = soup.select_one('#content, .TRS_Editor, .article_content, .content')
-        content = content_elem.get_text(separator='\n', strip=True) if content_elem else soup.get_text(separator='\n', strip=True)
-        content = self.clean_text(content)
+        title = _first(_TITLE_XPATH(tree))
+        title_text = _node_text(title) if title is not None else 'N/A'
         
-        meta_info = soup.select_one('.article_info, .pages-date, .article-inf')
-        meta_text = meta_info.get_text(strip=True) if meta_info else ''
+        meta_info = _first(_META_XPATH(tree))
+        meta_text = _node_text(meta_info) if meta_info is not None else ''
         
         pub_date = self.extract_date_from_text(meta_text) or self.extract_date_from_text(content)
         department = self.extract_department_from_text(meta_text) or self.extract_department_from_text(content)
@@ -160,10 +283,36 @@ class CACPolicyScraper:
             logger.warning(f"Could not find or click next page button. Ending pagination. Reason: {e}")
             return False
 
-    def scrape_all_policies(self) -> List[Dict[str, Any]]:
-        """Main scraping loop for all policies."""
-        all_policies = []
-        
+    def fetch_list_links(self, page_num: int) -> List[Tuple[str, str]]:
+        """Fetches a list page over plain HTTP; returns [] if the article list is not in the static HTML."""
+        response = self.safe_request(self.get_list_url(page_num))
+        if not response: return []
+        return self.extract_article_links(BeautifulSoup(response.content, 'lxml', from_encoding='utf-8'))
+
+    def iter_list_pages(self) -> Iterator[Tuple[int, List[Tuple[str, str]]]]:
+        """Yields (page_num, links) for each list page, using a browser only when plain HTTP is not enough."""
+        first_links = self.fetch_list_links(1)
+        if first_links:
+            logger.info("Article list is served as static HTML; paging over HTTP without a browser.")
+            yield from self._iter_http_list_pages(first_links)
+        else:
+            logger.info("Article list not found in static HTML; falling back to Selenium.")
+            yield from self._iter_browser_list_pages()
+
+    def _iter_http_list_pages(self, first_links: List[Tuple[str, str]]) -> Iterator[Tuple[int, List[Tuple[str, str]]]]:
+        links = first_links
+        for page_num in range(1, self.max_pages + 1):
+            if page_num > 1:
+                list_url = self.get_list_url(page_num)
+                logger.info(f"\n--- Scraping Page {page_num}: {list_url} ---")
+                links = self.fetch_list_links(page_num)
+            
+            if not links:
+                logger.info(f"No articles found on page {page_num}. Ending scrape.")
+                return
+            yield page_num, links
+
+    def _iter_browser_list_pages(self) -> Iterator[Tuple[int, List[Tuple[str, str]]]]:
         options = webdriver.ChromeOptions()
         options.add_argument('--headless')
         options.add_argument('--no-sandbox')
@@ -174,68 +323,146 @@ class CACPolicyScraper:
             self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
         except Exception as e:
             logger.error(f"Failed to start Selenium WebDriver: {e}")
-            return []
+            return
 
         try:
             list_url = self.get_list_url(1)
             logger.info(f"\n--- Scraping Page 1: {list_url} ---")
             self.driver.get(list_url)
+            wait = WebDriverWait(self.driver, 20, poll_frequency=0.1)
+            # Link count of the longest page seen so far
+            expected_min = 0
 
             for page_num in range(1, self.max_pages + 1):
                 if page_num > 1:
                     logger.info(f"\n--- Scraping Page {page_num} ---")
                 
                 try:
-                    WebDriverWait(self.driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "#loadingInfoPage li a")))
-                    time.sleep(random.uniform(2.0, 4.0))
+                    # Poll for the rendered list instead of sleeping a fixed 2-4s after it appears
+                    rendered_count = wait.until(_ListRendered(expected_min))
                 except Exception as e:
                     logger.warning(f"Timeout waiting for article list on page {page_num}. Ending scrape. Reason: {e}")
-                    break
+                    return
 
-                soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+                soup = BeautifulSoup(self.driver.page_source, 'lxml')
                 links = self.extract_article_links(soup)
                 
                 if not links:
                     logger.info(f"No articles found on page {page_num}. Ending scrape.")
-                    break
-                
-                logger.info(f"Found {len(links)} links on page {page_num}.")
-                
-                for url, title in links:
-                    if url not in [p['url'] for p in all_policies]:
-                        details = self.extract_article_content(url)
-                        if details and details.get('title') != 'N/A' and details.get('full_text'):
-                            all_policies.append(details)
+                    return
+                expected_min = max(expected_min, rendered_count)
+                yield page_num, links
                 
-                if not self.handle_pagination(page_num):
-                    break
-        
+                try:
+                    first_link = self.driver.find_element(By.CSS_SELECTOR, _LIST_LINK_CSS)
+                    if not self.handle_pagination(page_num):
+                        return
+                    # Wait for the old list to be replaced instead of sleeping a fixed 2-4s
+                    wait.until(EC.staleness_of(first_link))
+                except TimeoutException:
+                    logger.warning(f"Article list did not refresh after leaving page {page_num}.")
+                except Exception as e:
+                    logger.warning(f"Could not move past page {page_num}. Ending scrape. Reason: {e}")
+                    return
+        finally:
+            self.driver.quit()
+            self.driver = None
+            logger.info("Browser closed.")
+
+    def load_known_urls(self, filename: str) -> int:
+        """Loads the URLs of previously saved policies so that only new articles are scraped."""
+        if not os.path.exists(filename):
+            return 0
+        try:
+            urls = pd.read_csv(filename, usecols=['url'], dtype=str)['url'].dropna()
         except Exception as e:
-            logger.error(f"A critical error occurred during scraping: {e}", exc_info=True)
+            logger.error(f"Failed to read known URLs from {filename}: {e}")
+            return 0
+        self.known_urls = set(urls)
+        logger.info(f"Loaded {len(self.known_urls)} known policy URLs from {filename}.")
+        return len(self.known_urls)
+
+    def scrape_all_policies(self) -> List[Dict[str, Any]]:
+        """Main scraping loop for all policies."""
+        all_policies = []
+        submitted_urls = set()
+        pending = []
+        
+        # Article pages are plain HTML and are fetched concurrently over the pooled session.
+        # Each page's articles are queued and paging continues straight away, so the pool
+        # downloads articles while the next list page loads.
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        pages = self.iter_list_pages()
+        try:
+            try:
+                for page_num, links in pages:
+                    logger.info(f"Found {len(links)} links on page {page_num}.")
+                    
+                    # The list is newest first: once a whole page is already known, so is everything after it
+                    if self.known_urls and all(url in self.known_urls for url, title in links):
+                        logger.info(f"All articles on page {page_num} were scraped before. Ending scrape.")
+                        break
+                    
+                    for url, title in links:
+                        if url not in submitted_urls and url not in self.known_urls:
+                            submitted_urls.add(url)
+                            pending.append(executor.submit(self.extract_article_content, url))
+            except Exception as e:
+                # Paging failed: keep the articles already downloaded or in flight, drop the queued ones
+                logger.error(f"A critical error occurred during scraping: {e}", exc_info=True)
+                for future in pending:
+                    future.cancel()
+            finally:
+                pages.close()
+            
+            # Collect in link order
+            for future in pending:
+                if future.cancelled():
+                    continue
+                try:
+                    details = future.result()
+                except Exception as e:
+                    logger.error(f"Error scraping article: {e}", exc_info=True)
+                    continue
+                if details and details.get('title') != 'N/A' and details.get('full_text'):
+                    all_policies.append(details)
         finally:
-            if self.driver:
-                self.driver.quit()
-                logger.info("Browser closed.")
+            executor.shutdown(wait=True, cancel_futures=True)
         
         return all_policies
 
-    def save_to_csv(self, policies: List[Dict[str, Any]], filename: str) -> str:
-        """Saves a list of policy dictionaries to a CSV file."""
+    def save_to_csv(self, policies: List[Dict[str, Any]], filename: str, keep_existing: bool = False) -> str:
+        """Streams a list of policy dictionaries to a CSV file.
+
+        With keep_existing, policies already in the file are kept after the new ones.
+        """
         if not policies:
             logger.warning("No policies to save.")
             return ""
-            
-        df = pd.DataFrame(policies)
-        
-        output_columns = ['title', 'url', 'publication_date', 'issuing_department', 'full_text']
-        df = df[[col for col in output_columns if col in df.columns]]
         
+        new_urls = {policy.get('url') for policy in policies}
+        tmp_filename = f"{filename}.tmp"
         try:
-            df.to_csv(filename, index=False, encoding='utf-8-sig')
-            logger.info(f"Successfully saved {len(df)} policies to {filename}")
+            # Write to a temporary file first so the existing data can be streamed across
+            with open(tmp_filename, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=OUTPUT_COLUMNS, extrasaction='ignore', lineterminator='\n')
+                writer.writeheader()
+                writer.writerows(policies)
+                count = len(policies)
+                
+                if keep_existing and os.path.exists(filename):
+                    with open(filename, 'r', encoding='utf-8-sig', newline='') as existing:
+                        for row in csv.DictReader(existing):
+                            if row.get('url') not in new_urls:
+                                writer.writerow(row)
+                                count += 1
+            os.replace(tmp_filename, filename)
+            logger.info(f"Successfully saved {count} policies to {filename}")
             return filename
         except Exception as e:
             logger.error(f"Failed to save data to {filename}: {e}")
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
             return ""
 
 def main():
@@ -244,18 +471,24 @@ def main():
     print("网信办政策爬虫 v3.3 (Simplified, No AI Filter)")
     print("=" * 60)
     
+    output_file = "cac_all_policies.csv"
     scraper = CACPolicyScraper(max_pages=5)
+    # Incremental run: only articles not already in the output file are fetched
+    scraper.load_known_urls(output_file)
     
     policies = scraper.scrape_all_policies()
     
     if not policies:
-        print("\n未获取到任何政策数据，程序终止。")
+        if scraper.known_urls:
+            print(f"\n没有新的政策，{output_file} 保持不变。")
+        else:
+            print("\n未获取到任何政策数据，程序终止。")
         return
     
-    filename = scraper.save_to_csv(policies, "cac_all_policies.csv")
+    filename = scraper.save_to_csv(policies, output_file, keep_existing=True)
     
     if filename:
-        print(f"\n✓ 抓取完成: {len(policies)} 条政策已保存到 {filename}")
+        print(f"\n✓ 抓取完成: 新增 {len(policies)} 条政策已保存到 {filename}")
 
 if __name__ == "__main__":
     main()
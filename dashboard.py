@@ -40,6 +40,7 @@ TEXTS = {
         'chart_bar_yaxis': "Number of Documents",
         'header_details': "Policy Data Details",
         'expander_details': "Show/Hide Raw Data Columns",
+        'toggle_fulltext': "Include full text",
         'header_reference': "Key AI Laws & Regulations Reference",
         'expander_reference': "Click to expand/collapse",
         'ref_intro': "Below are some of the core legal and policy documents in China's AI, algorithmic recommendation, and data security landscape.",
@@ -103,6 +104,7 @@ TEXTS = {
         'chart_bar_yaxis': "文件数量",
         'header_details': "政策数据详情",
         'expander_details': "显示/隐藏 原始数据列",
+        'toggle_fulltext': "显示政策全文",
         'header_reference': "主要人工智能法律法规参考",
         'expander_reference': "点击展开/折叠",
         'ref_intro': "以下是中国在人工智能、算法推荐和数据安全领域部分核心的法律、法规和国家政策文件。",
@@ -159,6 +161,9 @@ LEVEL_TRANSLATION = {
 }
 
 
+FULLTEXT_PATH = "policies_fulltext.parquet"
+
+
 # --- Page Configuration ---
 st.set_page_config(
     page_title=TEXTS['en']['page_title'], # Default to EN
@@ -168,10 +173,16 @@ st.set_page_config(
 # --- Data Loading ---
 @st.cache_data
 def load_data(file_path):
-    if not os.path.exists(file_path):
+    # Prefer the Parquet copy written by the pipeline: columns arrive already typed
+    parquet_path = os.path.splitext(file_path)[0] + ".parquet"
+    if os.path.exists(parquet_path):
+        df = pd.read_parquet(parquet_path, engine="pyarrow", dtype_backend="pyarrow")
+        df['publication_date'] = df['publication_date'].astype('datetime64[ns]')
+    elif os.path.exists(file_path):
+        df = pd.read_csv(file_path)
+        df['publication_date'] = pd.to_datetime(df['publication_date'], errors='coerce')
+    else:
         return None, None
-    df = pd.read_csv(file_path)
-    df['publication_date'] = pd.to_datetime(df['publication_date'], errors='coerce')
     df.dropna(subset=['publication_date'], inplace=True)
     
     # Load metadata
@@ -184,6 +195,85 @@ def load_data(file_path):
 
     return df, overall_max_date
 
+@st.cache_data
+def load_fulltext(file_path):
+    # Full texts are kept out of the main dataset and only read when the user asks for them
+    return pd.read_parquet(file_path, engine="pyarrow").drop_duplicates(subset=['url'])
+
+# --- Cached Aggregations ---
+# Streamlit reruns the whole script on every widget interaction; these reductions only
+# depend on the data (and their arguments), so they are computed once and reused.
+@st.cache_data
+def compute_trend(df, freq):
+    # Only the numeric score column goes through the reduction; size() counts rows per bin
+    return df.set_index('publication_date')['regulatory_score'].resample(freq).agg(['mean', 'size']).rename(
+        columns={'mean': 'regulatory_score', 'size': 'policy_count'}
+    ).reset_index()
+
+@st.cache_data
+def compute_dept_counts(df, other_label):
+    dept_col = 'unified_department' if 'unified_department' in df.columns else 'issuing_department'
+    # Count before casting: missing values stay dropped and a categorical column only
+    # reports the departments actually present
+    dept_counts = df[dept_col].value_counts(dropna=True)
+    dept_counts = dept_counts[dept_counts > 0].rename_axis('department').reset_index(name='count')
+    dept_counts['department'] = dept_counts['department'].astype(str)
+    
+    threshold = max(dept_counts['count'].sum() * 0.05, 5)
+    
+    if len(dept_counts) > 5:
+        # Fold small departments into a single "other" row appended last (counts are sorted);
+        # a real department that happens to share the label keeps its own row
+        small = dept_counts['count'] < threshold
+        if small.any():
+            other = pd.DataFrame({'department': [other_label], 'count': [dept_counts.loc[small, 'count'].sum()]})
+            dept_counts = pd.concat([dept_counts[~small], other], ignore_index=True)
+    return dept_counts
+
+@st.cache_data
+def compute_level_counts(df):
+    level_order = ['法律法规', '行政规章', '行业标准', '指导性文件']
+    level_counts = df['enforcement_level'].value_counts().reindex(level_order).fillna(0).reset_index()
+    level_counts.columns = ['level', 'count']
+    return level_counts
+
+# --- Cached Figures ---
+# Plotly Express rebuilds the whole figure spec on every call; the pie and bar charts only
+# change when their (small, already translated) input frame or the language changes.
+@st.cache_data
+def build_dept_pie(dept_display, lang_code):
+    T = TEXTS[lang_code]
+    return px.pie(dept_display, names='department', values='count', title=T['chart_pie_title'])
+
+@st.cache_data
+def build_level_bar(level_counts, lang_code):
+    T = TEXTS[lang_code]
+    fig_bar = px.bar(
+        level_counts, x='level', y='count',
+        title=T['chart_bar_title'],
+        labels={'level': T['chart_bar_xaxis'], 'count': T['chart_bar_yaxis']},
+        color='level', text='count'
+    )
+    fig_bar.update_layout(xaxis_title=None, yaxis_title=T['chart_bar_yaxis'], showlegend=False)
+    return fig_bar
+
+@st.cache_data
+def build_metrics_html(lang_code, total_policies, avg_score, min_date, max_date):
+    T = TEXTS[lang_code]
+    return f"""
+    <style>
+        .metric-container {{ display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 1rem; }}
+        .metric {{ background-color: #f0f2f6; padding: 0.5rem 1rem; border-radius: 0.25rem; }}
+        .metric-label {{ font-size: 0.9rem; color: #4f4f4f; }}
+        .metric-value {{ font-size: 1.5rem; font-weight: 600; color: #262730; }}
+    </style>
+    <div class="metric-container">
+        <div class="metric"><div class="metric-label">{T['metric_total']}</div><div class="metric-value">{total_policies}</div></div>
+        <div class="metric"><div class="metric-label">{T['metric_avg_score']}</div><div class="metric-value">{avg_score:.2f}</div></div>
+        <div class="metric"><div class="metric-label">{T['metric_date_range']}</div><div class="metric-value">{min_date} to {max_date}</div></div>
+    </div>
+    """
+
 # --- Main Application ---
 def main():
     # --- Language Selection ---
@@ -213,19 +303,7 @@ def main():
     st.header(T['header_overview'])
     total_policies, avg_score, min_date, max_date = len(df), df['regulatory_score'].mean(), df['publication_date'].min().strftime('%Y-%m-%d'), df['publication_date'].max().strftime('%Y-%m-%d')
     
-    st.markdown(f"""
-    <style>
-        .metric-container {{ display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 1rem; }}
-        .metric {{ background-color: #f0f2f6; padding: 0.5rem 1rem; border-radius: 0.25rem; }}
-        .metric-label {{ font-size: 0.9rem; color: #4f4f4f; }}
-        .metric-value {{ font-size: 1.5rem; font-weight: 600; color: #262730; }}
-    </style>
-    <div class="metric-container">
-        <div class="metric"><div class="metric-label">{T['metric_total']}</div><div class="metric-value">{total_policies}</div></div>
-        <div class="metric"><div class="metric-label">{T['metric_avg_score']}</div><div class="metric-value">{avg_score:.2f}</div></div>
-        <div class="metric"><div class="metric-label">{T['metric_date_range']}</div><div class="metric-value">{min_date} to {max_date}</div></div>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(build_metrics_html(lang_code, total_policies, avg_score, min_date, max_date), unsafe_allow_html=True)
     
     st.markdown("---")
 
@@ -243,10 +321,7 @@ def main():
     freq_map = {granularity_options[0]: 'Y', granularity_options[1]: 'Q', granularity_options[2]: 'M'}
     selected_freq = freq_map[time_granularity]
 
-    monthly_trend = df.set_index('publication_date').resample(selected_freq).agg({
-        'regulatory_score': 'mean',
-        'title': 'count'
-    }).rename(columns={'title': 'policy_count'}).reset_index()
+    monthly_trend = compute_trend(df, selected_freq)
 
     fig_trend = px.line(
         monthly_trend, x='publication_date', y='regulatory_score',
@@ -267,58 +342,36 @@ def main():
 
     with col_pie:
         st.header(T['header_pie'])
-        if 'unified_department' in df.columns:
-            dept_counts = df['unified_department'].value_counts().reset_index()
-        else:
-            dept_counts = df['issuing_department'].value_counts().reset_index()
-            
-        dept_counts.columns = ['department', 'count']
-        
-        threshold = max(dept_counts['count'].sum() * 0.05, 5)
-        
-        if len(dept_counts) > 5:
-            other_count = dept_counts[dept_counts['count'] < threshold]['count'].sum()
-            main_depts = dept_counts[dept_counts['count'] >= threshold]
-            if other_count > 0:
-                other_row = pd.DataFrame([{'department': T['pie_other_dept'], 'count': other_count}])
-                dept_display = pd.concat([main_depts, other_row], ignore_index=True)
-            else:
-                dept_display = main_depts
-        else:
-            dept_display = dept_counts
+        dept_display = compute_dept_counts(df, T['pie_other_dept'])
         
         # Translate data for the chart if English is selected
         if lang_code == 'en':
             dept_display['department'] = dept_display['department'].map(DEPT_TRANSLATION).fillna(dept_display['department'])
 
-        fig_pie = px.pie(dept_display, names='department', values='count', title=T['chart_pie_title'])
+        fig_pie = build_dept_pie(dept_display, lang_code)
         st.plotly_chart(fig_pie, use_container_width=True)
 
     with col_bar:
         st.header(T['header_bar'])
-        level_order = ['法律法规', '行政规章', '行业标准', '指导性文件']
-        level_counts = df['enforcement_level'].value_counts().reindex(level_order).fillna(0).reset_index()
-        level_counts.columns = ['level', 'count']
+        level_counts = compute_level_counts(df)
 
         # Translate data for the chart if English is selected
         if lang_code == 'en':
             level_counts['level'] = level_counts['level'].map(LEVEL_TRANSLATION).fillna(level_counts['level'])
 
-        fig_bar = px.bar(
-            level_counts, x='level', y='count',
-            title=T['chart_bar_title'],
-            labels={'level': T['chart_bar_xaxis'], 'count': T['chart_bar_yaxis']},
-            color='level', text='count'
-        )
-        fig_bar.update_layout(xaxis_title=None, yaxis_title=T['chart_bar_yaxis'], showlegend=False)
+        fig_bar = build_level_bar(level_counts, lang_code)
         st.plotly_chart(fig_bar, use_container_width=True)
         
     st.markdown("---")
     
     st.header(T['header_details'])
     with st.expander(T['expander_details']):
+        details_df = df
+        if 'full_text' not in df.columns and os.path.exists(FULLTEXT_PATH):
+            if st.toggle(T['toggle_fulltext'], key='show_fulltext'):
+                details_df = df.merge(load_fulltext(FULLTEXT_PATH), on='url', how='left')
         st.data_editor(
-            df,
+            details_df,
             column_config={
                 "title": st.column_config.TextColumn(
                     "Title",
@@ -4,9 +4,12 @@ ARPI Platform - Master Data Pipeline
 Orchestrates the entire ETL and analysis process.
 """
 import os
+import numpy as np
 import pandas as pd
 import re
 import json # Import json module
+import pyarrow as pa
+import pyarrow.csv as pacsv
 from ai_analysis import PolicyAnalyzer
 import logging
 
@@ -22,27 +25,71 @@ AI_KEYWORDS = [
     "智能", "算法推荐"
 ]
 
-def calculate_ai_score(row):
-    """Calculates an AI relevance score for a given policy row."""
-    score = 0
-    title = row.get('title', '')
-    text = row.get('full_text', '')
-    
-    if not isinstance(title, str) or not isinstance(text, str):
-        return 0
+# Per-occurrence weight of each keyword, aligned with AI_KEYWORDS
+AI_HIGH_WEIGHT_KEYWORDS = {"人工智能", "大模型", "生成式", "AIGC"}
+AI_MID_WEIGHT_KEYWORDS = {"算法", "智能", "深度合成", "机器学习", "深度学习"}
+AI_WEIGHTS = np.array([3 if k in AI_HIGH_WEIGHT_KEYWORDS else 2 if k in AI_MID_WEIGHT_KEYWORDS else 1
+                       for k in AI_KEYWORDS], dtype=np.int64)
+# Lowercased, regex-escaped keywords for Series.str.count, aligned with AI_WEIGHTS
+AI_KEYWORDS_LOWER = [re.escape(k.lower()) for k in AI_KEYWORDS]
+
+# Book-title marks around a policy name, e.g. 《生成式人工智能服务管理暂行办法》
+CORE_TITLE_RE = re.compile(r'《([^》]+)》')
+
+def score_ai_series(combined_lower):
+    """Scores a Series of lowercased text: weighted sum of per-keyword occurrence counts."""
+    scores = np.zeros(len(combined_lower), dtype=np.int64)
+    for pattern, weight in zip(AI_KEYWORDS_LOWER, AI_WEIGHTS):
+        scores += combined_lower.str.count(pattern).to_numpy(dtype=np.int64) * weight
+    return scores
+
+# Columns written by the scrapers, all read as strings so the reader skips type inference
+SOURCE_COLUMNS = ['title', 'url', 'publication_date', 'issuing_department', 'full_text']
+# Source CSVs are streamed in blocks of about this many bytes; only the current block and the
+# de-duplicated survivors of earlier blocks are held in memory
+READ_BLOCK_SIZE = 16 << 20
+
+def iter_source_chunks(filename, block_size=READ_BLOCK_SIZE):
+    """Streams a scraper CSV as DataFrames of Arrow-backed string columns, one per block."""
+    read_options = pacsv.ReadOptions(block_size=block_size)
+    convert_options = pacsv.ConvertOptions(
+        include_columns=SOURCE_COLUMNS,
+        include_missing_columns=True,
+        column_types={col: pa.string() for col in SOURCE_COLUMNS},
+    )
+    # full_text contains newlines inside quoted values
+    parse_options = pacsv.ParseOptions(newlines_in_values=True)
+    types_mapper = {pa.string(): pd.StringDtype('pyarrow')}.get
+    with pacsv.open_csv(filename, read_options=read_options, parse_options=parse_options,
+                        convert_options=convert_options) as reader:
+        for batch in reader:
+            if batch.num_rows:
+                yield batch.to_pandas(types_mapper=types_mapper)
 
-    full_content = title.lower() + " " + text.lower()
+def clean_chunk(df, source):
+    """Tags, cleans and derives the core title for one block of a source CSV."""
+    df['source'] = source
+    # Scrapers normalize dates to YYYY-MM-DD, so the ISO8601 fast path applies; anything else becomes NaT
+    df['publication_date'] = pd.to_datetime(df['publication_date'], format='ISO8601', errors='coerce')
+    df = df.dropna(subset=['title', 'publication_date'])
     
-    for keyword in AI_KEYWORDS:
-        count = full_content.count(keyword.lower())
-        if count > 0:
-            if keyword in ["人工智能", "大模型", "生成式", "AIGC"]:
-                score += count * 3
-            elif keyword in ["算法", "智能", "深度合成", "机器学习", "深度学习"]:
-                score += count * 2
-            else:
-                score += count
-    return score
+    text_cols = ['title', 'issuing_department', 'full_text']
+    df[text_cols] = df[text_cols].fillna('').astype(str)
+
+    # Core title is the text inside 《...》, falling back to the full title if there are no marks
+    core_title = df['title'].str.extract(CORE_TITLE_RE, expand=False)
+    df['core_title'] = core_title.fillna(df['title'])
+    return df
+
+def keep_best_per_title(df):
+    """Keeps one row per core title: the newest, then the longest; earlier rows win ties."""
+    # Ordering by core_title as well is not needed, since drop_duplicates keeps the first
+    # row of each title wherever it sits. The text length is only a sort key (the analysis
+    # stage reports content_length itself).
+    df = (df.assign(_len=df['full_text'].str.len().to_numpy())
+          .sort_values(by=['publication_date', '_len'], ascending=[False, False], kind='stable')
+          .drop(columns='_len'))
+    return df.drop_duplicates(subset=['core_title'], keep='first')
 
 def unify_data():
     """Loads, unifies, de-duplicates, and filters data from all scraper CSVs.
@@ -53,16 +100,36 @@ def unify_data():
         "miit": "miit_all_policies.csv",
         "tc260": "tc260_all_policies.csv"
     }
+    # Each block is cleaned and de-duplicated on its own, so only its best candidates are kept.
+    # The best row of a title overall is always the best row of its block, so a final pass over
+    # the survivors gives the same result as de-duplicating everything at once.
     all_dfs = []
+    chunk_max_dates = []
+    num_loaded = 0
+    num_before_dedup = 0
     for source, filename in source_files.items():
         if os.path.exists(filename):
             logging.info(f"  - Loading {filename}...")
+            # Per-file results are merged only once the whole file has been read, so a file
+            # that fails partway contributes neither rows nor counts nor dates
+            file_dfs = []
+            file_max_dates = []
+            file_loaded = 0
+            file_cleaned = 0
             try:
-                df = pd.read_csv(filename)
-                df['source'] = source
-                all_dfs.append(df)
+                for chunk in iter_source_chunks(filename):
+                    file_loaded += len(chunk)
+                    chunk = clean_chunk(chunk, source)
+                    file_cleaned += len(chunk)
+                    file_max_dates.append(chunk['publication_date'].max())
+                    file_dfs.append(keep_best_per_title(chunk))
             except Exception as e:
                 logging.error(f"    - Error loading {filename}: {e}")
+                continue
+            all_dfs.extend(file_dfs)
+            chunk_max_dates.extend(file_max_dates)
+            num_loaded += file_loaded
+            num_before_dedup += file_cleaned
         else:
             logging.warning(f"  - File not found: {filename}")
 
@@ -70,44 +137,23 @@ def unify_data():
         logging.error("No data files found to unify. Halting.")
         return None, None # Return None for both df and max_date
 
-    unified_df = pd.concat(all_dfs, ignore_index=True)
-    logging.info(f"  - Total policies loaded: {len(unified_df)}")
+    logging.info(f"  - Total policies loaded: {num_loaded}")
     
-    # --- Data Cleaning and Intelligent De-duplication ---
-    unified_df.dropna(subset=['title'], inplace=True)
-    unified_df['publication_date'] = pd.to_datetime(unified_df['publication_date'], errors='coerce')
-    unified_df.dropna(subset=['publication_date'], inplace=True)
-    
-    for col in ['title', 'issuing_department', 'full_text']:
-        if col in unified_df.columns:
-            unified_df[col] = unified_df[col].astype(str).fillna('')
-
     # Capture overall max date before any filtering
-    overall_max_date = unified_df['publication_date'].max() 
+    overall_max_date = pd.Series(chunk_max_dates, dtype='datetime64[ns]').max()
     logging.info(f"  - Overall latest policy date: {overall_max_date.strftime('%Y-%m-%d')}")
 
-    # Helper to extract core title from 《...》
-    def get_core_title(title):
-        match = re.search(r'《([^》]+)》', title)
-        if match:
-            return match.group(1)
-        return title # Fallback to full title if no marks
-    
-    unified_df['core_title'] = unified_df['title'].apply(get_core_title)
-    unified_df['content_length'] = unified_df['full_text'].str.len()
-
-    # Sort by core title, then date (newest first), then content length (longest first)
-    unified_df.sort_values(by=['core_title', 'publication_date', 'content_length'], ascending=[True, False, False], inplace=True)
-    
-    # De-duplicate based on the core title, keeping the best candidate (the first one after sorting)
-    num_before_dedup = len(unified_df)
-    unified_df.drop_duplicates(subset=['core_title'], keep='first', inplace=True)
+    # --- Intelligent De-duplication ---
+    # De-duplicate based on the core title, keeping the best candidate across all blocks
+    unified_df = keep_best_per_title(pd.concat(all_dfs, ignore_index=True))
+    unified_df['source'] = unified_df['source'].astype('category')
     num_after_dedup = len(unified_df)
     logging.info(f"  - Intelligent de-duplication: {num_before_dedup} -> {num_after_dedup} policies.")
     
     # --- AI Policy Filtering ---
     logging.info("  - Applying centralized AI filter...")
-    unified_df['ai_score'] = unified_df.apply(calculate_ai_score, axis=1)
+    combined_text = unified_df['title'].fillna('').str.lower() + " " + unified_df['full_text'].fillna('').str.lower()
+    unified_df['ai_score'] = score_ai_series(combined_text)
     
     ai_filtered_df = unified_df[unified_df['ai_score'] > 4].copy()
     logging.info(f"  - AI Filter Result: {len(ai_filtered_df)} / {len(unified_df)} policies identified as AI-related.")
@@ -117,35 +163,54 @@ def unify_data():
         return None, None # Return None for both df and max_date
 
     # --- Department Name Standardization ---
-    def standardize_department(name):
-        name = str(name)
-        if '工业和信息化部' in name:
-            return '中华人民共和国工业和信息化部'
-        if '网信办' in name or '国家互联网信息办公室' in name:
-            return '国家互联网信息办公室'
-        if '市场监督管理总局' in name:
-            return '国家市场监督管理总局'
-        if '全国信息安全标准化技术委员会' in name:
-            return '全国信息安全标准化技术委员会'
-        if name == '科技司':
-            return '科技司'
-        if name == '办公厅':
-            return '办公厅'
-        return name
-
-    ai_filtered_df['unified_department'] = ai_filtered_df['issuing_department'].apply(standardize_department)
+    # First matching rule wins; anything unmatched (e.g. 科技司, 办公厅) keeps its own name.
+    departments = ai_filtered_df['issuing_department'].astype(str)
+    department_rules = [
+        ('工业和信息化部', '中华人民共和国工业和信息化部'),
+        ('网信办|国家互联网信息办公室', '国家互联网信息办公室'),
+        ('市场监督管理总局', '国家市场监督管理总局'),
+        ('全国信息安全标准化技术委员会', '全国信息安全标准化技术委员会'),
+    ]
+    conditions = [departments.str.contains(pattern, regex=True, na=False).to_numpy(dtype=bool)
+                  for pattern, _ in department_rules]
+    choices = [unified for _, unified in department_rules]
+    ai_filtered_df['unified_department'] = pd.Categorical(
+        np.select(conditions, choices, default=departments.to_numpy(dtype=object)))
     logging.info("  - Department names standardized.")
     
     return ai_filtered_df, overall_max_date
 
+def write_csv_arrow(df, path):
+    """Writes df as a UTF-8 (BOM) CSV with Arrow's C++ writer instead of pandas' row formatter.
+    Values are written as DataFrame.to_csv wrote them: list columns as their Python repr,
+    booleans as True/False, floats as their repr (5.0, not 5) and midnight-only datetimes
+    as plain dates. Unlike to_csv, Arrow
+    quotes every text field; the file stays standard CSV for pandas and Excel."""
+    arrays = []
+    for name, col in df.items():
+        if pd.api.types.is_bool_dtype(col):
+            arrays.append(pa.array(col.map({True: 'True', False: 'False'}), type=pa.string(), from_pandas=True))
+        elif pd.api.types.is_float_dtype(col):
+            arrays.append(pa.array(col.map(repr, na_action='ignore'), type=pa.string(), from_pandas=True))
+        elif pd.api.types.is_datetime64_any_dtype(col) and (col.dropna() == col.dropna().dt.normalize()).all():
+            arrays.append(pa.array(col.dt.date, type=pa.date32()))
+        elif col.dtype == object and col.map(lambda v: isinstance(v, (list, tuple))).any():
+            arrays.append(pa.array(col.map(str), type=pa.string()))
+        else:
+            arrays.append(pa.array(col, from_pandas=True))
+    table = pa.Table.from_arrays(arrays, names=[str(c) for c in df.columns])
+    with open(path, 'wb') as f:
+        f.write(b'\xef\xbb\xbf')
+        pacsv.write_csv(table, f)
+
 def analyze_data(df):
     """Applies AI analysis to the unified DataFrame."""
     if df is None:
         return None
     logging.info("--- Stage 2: Analyzing Data ---")
     analyzer = PolicyAnalyzer()
-    analysis_results = [analyzer.analyze_policy(row.to_dict()) for _, row in df.iterrows()]
-    analyzed_df = pd.concat([df.reset_index(drop=True), pd.DataFrame(analysis_results)], axis=1)
+    analysis_results = analyzer.analyze_policies(df[['title', 'full_text']])
+    analyzed_df = pd.concat([df.reset_index(drop=True), analysis_results.reset_index(drop=True)], axis=1)
     logging.info("  - Analysis complete.")
     
     # Sort by publication_date from newest to oldest
@@ -153,11 +218,22 @@ def analyze_data(df):
     logging.info("  - Policies sorted by publication date (newest first).")
 
     try:
-        analyzed_df.to_csv("all_policies_analyzed.csv", index=False, encoding='utf-8-sig')
+        write_csv_arrow(analyzed_df, "all_policies_analyzed.csv")
         logging.info("  - Successfully saved analyzed data to: all_policies_analyzed.csv")
     except Exception as e:
         logging.error(f"  - Error saving analyzed data: {e}")
         return None
+
+    # Columnar copy for the dashboard: typed columns, no CSV re-parsing on load.
+    # The bulky full_text goes to a side file that the dashboard only loads on demand.
+    try:
+        analyzed_df[['url', 'full_text']].to_parquet(
+            "policies_fulltext.parquet", engine="pyarrow", compression="zstd", index=False)
+        analyzed_df.drop(columns=['full_text']).to_parquet(
+            "all_policies_analyzed.parquet", engine="pyarrow", compression="zstd", index=False)
+        logging.info("  - Successfully saved analyzed data to: all_policies_analyzed.parquet (+ policies_fulltext.parquet)")
+    except Exception as e:
+        logging.error(f"  - Error saving analyzed parquet: {e}")
         
     return analyzed_df
 
@@ -3,11 +3,15 @@
 Dedicated scraper for policies from www.miit.gov.cn (中华人民共和国工业和信息化部).
 This version is simplified to only scrape data, with filtering handled centrally.
 """
+import contextlib
+import os
 import time
 import random
 import re
+import threading
 import pandas as pd
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
@@ -15,7 +19,10 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
+import soupsieve as sv
 import requests
+import requests_cache
+from requests.adapters import HTTPAdapter
 import logging
 from urllib.parse import urljoin
 
@@ -26,17 +33,66 @@ logger = logging.getLogger(__name__)
 MIIT_BASE_URL = "https://www.miit.gov.cn"
 MIIT_POLICY_LIST_PATH = "/jgsj/kjs/wjfb/"  # 科技司-文件发布
 
+# chromedriver path resolved by webdriver-manager, recorded so later runs skip its version check
+CHROMEDRIVER_PATH_FILE = '.chromedriver_path'
+_chromedriver_path_cache = None
+
+# Policy detail pages rarely change once published; cache them on disk across runs
+HTTP_CACHE_NAME = '.http_cache'  # SQLite file: .http_cache.sqlite
+HTTP_CACHE_EXPIRE = timedelta(days=7)
+
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 }
 
+# Patterns compiled once at import
+_PUBLISHED_DATE_RE = re.compile(r'发布日期[:：\s]*(\d{4}[-/年]\d{1,2}[-/月]\d{1,2})')
+_DEPT_LABEL_RE = re.compile(r'(?:发文机关|发布单位|发布部门)[:：\s]*(.*?)(?:\n|$|\s{2,})')
+_DATE_PATTERNS = [
+    re.compile(r'(\d{4}[-/年]\d{1,2}[-/月]\d{1,2})日?'),
+    _PUBLISHED_DATE_RE,
+]
+_DEPT_PATTERNS = [
+    _DEPT_LABEL_RE,
+    re.compile(r'(.*?)(?:部|委|局|厅)[\s]?(?:令|发|函|文|规|公告|通知|意见)'),
+]
+_ARTICLE_PATH_RE = re.compile(r'/\d{4,}/\d+\.html')
+# Candidate policy links in the list: art_ links are articles outright; .html links are
+# articles only if their resolved URL also matches _ARTICLE_PATH_RE
+_LIST_CONTAINER_SEL = sv.compile('.page-content ul')
+_POLICY_LINK_SEL = sv.compile('a[href*="art_"], a[href*=".html"]')
+
+# One cached session is shared by all detail-fetching worker threads: urllib3's connection
+# pool and the requests-cache SQLite backend do their own locking, whereas separate
+# sessions on the same cache file could fail with "database is locked".
+_shared_session = None
+_session_lock = threading.Lock()
+
 # --- Helper Functions ---
+def _session():
+    """Returns the shared (cached) requests.Session, creating it on first use.
+    Only detail pages go through it; list pages are read with Selenium."""
+    global _shared_session
+    with _session_lock:
+        if _shared_session is None:
+            session = requests_cache.CachedSession(HTTP_CACHE_NAME, backend='sqlite', expire_after=HTTP_CACHE_EXPIRE)
+            session.headers.update(HEADERS)
+            # Keep-alive connections to www.miit.gov.cn are reused across requests;
+            # safe_get does its own retrying, so the adapter does not retry.
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _shared_session = session
+        return _shared_session
+
 def safe_get(url, headers=None, retries=3, delay_range=(1, 3)):
     """Robustly makes an HTTP GET request with retries and delays."""
     for i in range(retries):
         try:
-            time.sleep(random.uniform(*delay_range))
-            response = requests.get(url, headers=headers, timeout=15)
+            response = _session().get(url, headers=headers, timeout=15)
+            # Pace requests that reached the server; cached responses need no politeness delay
+            if not getattr(response, 'from_cache', False):
+                time.sleep(random.uniform(*delay_range))
             response.raise_for_status()
             response.encoding = response.apparent_encoding
             return response
@@ -48,12 +104,8 @@ def safe_get(url, headers=None, retries=3, delay_range=(1, 3)):
 
 def extract_date_from_text(text):
     """Attempts to extract a date from text using common patterns."""
-    date_patterns = [
-        r'(\d{4}[-/年]\d{1,2}[-/月]\d{1,2})日?',
-        r'发布日期[:：\s]*(\d{4}[-/年]\d{1,2}[-/月]\d{1,2})',
-    ]
-    for pattern in date_patterns:
-        match = re.search(pattern, text)
+    for pattern in _DATE_PATTERNS:
+        match = pattern.search(text)
         if match:
             date_str = match.group(1).replace('年', '-').replace('月', '-').replace('/', '-')
             try:
@@ -64,12 +116,8 @@ def extract_date_from_text(text):
 
 def extract_department_from_text(text):
     """Attempts to extract an issuing department from text."""
-    dept_patterns = [
-        r'(?:发文机关|发布单位|发布部门)[:：\s]*(.*?)(?:\n|$|\s{2,})',
-        r'(.*?)(?:部|委|局|厅)[\s]?(?:令|发|函|文|规|公告|通知|意见)'
-    ]
-    for pattern in dept_patterns:
-        match = re.search(pattern, text)
+    for pattern in _DEPT_PATTERNS:
+        match = pattern.search(text)
         if match:
             department = match.group(1).strip()
             if 3 <= len(department) <= 30 and "、" not in department and "，" not in department:
@@ -85,7 +133,7 @@ def get_miit_policy_details(policy_url):
     if not response:
         return details
 
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = BeautifulSoup(response.text, 'lxml')
     for script_or_style in soup(["script", "style"]):
         script_or_style.decompose()
 
@@ -103,30 +151,66 @@ def get_miit_policy_details(policy_url):
     if meta_info_div:
         meta_text = meta_info_div.get_text()
         if not details['publication_date']:
-            date_match = re.search(r'发布日期[:：\s]*(\d{4}[-/年]\d{1,2}[-/月]\d{1,2})', meta_text)
+            date_match = _PUBLISHED_DATE_RE.search(meta_text)
             if date_match:
                 details['publication_date'] = date_match.group(1).replace('年', '-').replace('月', '-')
         if not details['issuing_department'] or details['issuing_department'] == "工业和信息化部":
-            dept_match = re.search(r'(?:发文机关|发布单位|发布部门)[:：\s]*(.*?)(?:\n|$|\s{2,})', meta_text)
+            dept_match = _DEPT_LABEL_RE.search(meta_text)
             if dept_match:
                 details['issuing_department'] = dept_match.group(1).strip()
     return details
 
-def scrape_miit_policy_list(max_pages=5):
-    """Scrapes policy links from MIIT's policy list pages using Selenium."""
-    all_policies_data = []
-    logger.info("--- Starting browser for scraping ---")
+def _chromedriver_path(refresh=False):
+    """Returns the chromedriver binary path. It is resolved with webdriver-manager only on the
+    first run (or with refresh=True); otherwise the path recorded on disk is reused."""
+    global _chromedriver_path_cache
+    if not refresh:
+        if _chromedriver_path_cache:
+            return _chromedriver_path_cache
+        try:
+            with open(CHROMEDRIVER_PATH_FILE, encoding='utf-8') as f:
+                path = f.read().strip()
+            if path and os.path.exists(path):
+                _chromedriver_path_cache = path
+                return path
+        except OSError:
+            pass
+    path = ChromeDriverManager().install()
+    try:
+        with open(CHROMEDRIVER_PATH_FILE, 'w', encoding='utf-8') as f:
+            f.write(path)
+    except OSError as e:
+        logger.warning(f"Could not record chromedriver path: {e}")
+    _chromedriver_path_cache = path
+    return path
+
+@contextlib.contextmanager
+def chrome_driver():
+    """Starts a headless Chrome for list paging and always quits it on exit."""
     options = webdriver.ChromeOptions()
     options.add_argument('--headless')
     options.add_argument('--no-sandbox')
     options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-gpu')
+    # Only the list markup is needed; skipping images cuts page load time
+    options.add_argument('--blink-settings=imagesEnabled=false')
     options.add_argument(f"user-agent={HEADERS['User-Agent']}")
     try:
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+        driver = webdriver.Chrome(service=Service(_chromedriver_path()), options=options)
     except Exception as e:
-        logger.error(f"Could not start Selenium WebDriver: {e}")
-        return []
+        # The recorded driver may no longer match the installed Chrome; resolve it again once
+        logger.warning(f"Could not start Chrome with the cached driver, refreshing it: {e}")
+        driver = webdriver.Chrome(service=Service(_chromedriver_path(refresh=True)), options=options)
+    try:
+        yield driver
+    finally:
+        logger.info("Closing browser.")
+        driver.quit()
 
+def collect_miit_policy_urls(driver, max_pages=5):
+    """Walks MIIT's policy list pages in the browser and returns the detail URLs in list order.
+    Only list pages are handled here; detail pages are fetched separately over HTTP."""
+    policy_urls = {}  # insertion-ordered set
     try:
         list_url = f"{MIIT_BASE_URL}{MIIT_POLICY_LIST_PATH}index.html"
         logger.info(f"Accessing initial list page: {list_url}")
@@ -142,30 +226,28 @@ def scrape_miit_policy_list(max_pages=5):
                 break
             
             list_element_for_staleness_check = driver.find_element(By.CSS_SELECTOR, ".page-content ul")
-            soup = BeautifulSoup(driver.page_source, 'html.parser')
-            policy_links_container = soup.select_one('.page-content ul')
+            soup = BeautifulSoup(driver.page_source, 'lxml')
+            policy_links_container = _LIST_CONTAINER_SEL.select_one(soup)
             
             if not policy_links_container:
                 logger.warning("Could not find policy list container.")
                 break
             
-            links = policy_links_container.find_all('a', href=True)
             found_on_page = 0
-            for link in links:
+            for link in _POLICY_LINK_SEL.select(policy_links_container):
                 href = link['href'].strip()
+                is_article = 'art_' in href
                 if href.startswith('./'):
                     href = href[1:]
                 
                 full_url = urljoin(MIIT_BASE_URL + MIIT_POLICY_LIST_PATH, href)
 
-                if 'art_' in full_url or re.search(r'/\d{4,}/\d+\.html', full_url):
-                    if full_url not in [p['url'] for p in all_policies_data]:
-                        policy_data = get_miit_policy_details(full_url)
-                        if policy_data and policy_data['title'] != 'N/A' and policy_data['full_text']:
-                            all_policies_data.append(policy_data)
-                            found_on_page += 1
+                if is_article or _ARTICLE_PATH_RE.search(full_url):
+                    if full_url not in policy_urls:
+                        policy_urls[full_url] = None
+                        found_on_page += 1
             
-            logger.info(f"Found {found_on_page} new policies on page {page_num}.")
+            logger.info(f"Found {found_on_page} new policy links on page {page_num}.")
             
             if page_num < max_pages:
                 try:
@@ -184,10 +266,36 @@ def scrape_miit_policy_list(max_pages=5):
                     break
     except Exception as e:
         logger.critical(f"A critical error occurred during Selenium scraping: {e}")
-    finally:
-        logger.info("Closing browser.")
-        driver.quit()
-    return all_policies_data
+    return list(policy_urls)
+
+def _try_get_miit_policy_details(policy_url):
+    """get_miit_policy_details that logs errors and returns {} so one bad page cannot abort the batch."""
+    try:
+        return get_miit_policy_details(policy_url)
+    except Exception as e:
+        logger.error(f"Error scraping {policy_url}: {e}")
+        return {}
+
+def fetch_miit_policy_details(policy_urls, max_workers=8):
+    """Fetches the given detail pages concurrently and returns the usable policies in URL order."""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return [policy_data for policy_data in executor.map(_try_get_miit_policy_details, policy_urls)
+                if policy_data and policy_data['title'] != 'N/A' and policy_data['full_text']]
+
+def scrape_miit_policy_list(max_pages=5, max_workers=8):
+    """Scrapes MIIT policies in two phases: collect detail URLs from the list pages using
+    Selenium, then fetch the detail pages concurrently with max_workers threads."""
+    logger.info("--- Starting browser for scraping ---")
+    # Detail pages never touch the browser, so it is closed before the long fetch phase
+    try:
+        with chrome_driver() as driver:
+            policy_urls = collect_miit_policy_urls(driver, max_pages)
+    except Exception as e:
+        logger.error(f"Could not start Selenium WebDriver: {e}")
+        return []
+
+    logger.info(f"Collected {len(policy_urls)} policy links. Fetching details...")
+    return fetch_miit_policy_details(policy_urls, max_workers)
 
 def main():
     """Main function to run the MIIT policy scraper."""
@@ -6,8 +6,10 @@ This version is simplified to only scrape data, with filtering handled centrally
 import re
 import time
 import requests
+import requests_cache
 import pandas as pd
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from typing import List, Tuple, Dict, Any
 from bs4 import BeautifulSoup
 import random
@@ -17,26 +19,48 @@ from urllib.parse import urljoin
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Patterns compiled once at import
+_DATE_PATTERNS = [
+    re.compile(r'(\d{4}[-/年]\d{1,2}[-/月]\d{1,2})日?'),
+    re.compile(r'发布于[:：\s]*(\d{4}[-/年]\d{1,2}[-/月]\d{1,2})'),
+]
+_JUMP_DETAIL_RE = re.compile(r"jumpDetail\('([^']*)'")
+
 class TC260PolicyScraper:
     """TC260 意见征求稿爬虫"""
 
-    def __init__(self, max_pages=10):
+    def __init__(self, max_pages=10, max_workers=8):
         self.base_url = "https://www.tc260.org.cn"
         self.list_path = "/portal/suggestion"
         self.max_pages = max_pages
+        self.max_workers = max_workers
         self.delay_range = (0.5, 1.5)
+        # Detail pages rarely change once published and are cached on disk across runs;
+        # list pages always go to the network so new entries are picked up.
+        self.cache_name = '.http_cache'  # SQLite file: .http_cache.sqlite
+        self.cache_expire_after = timedelta(days=7)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
         }
+        # Sessions are shared by the detail-fetching worker threads, as in the other scrapers:
+        # urllib3's connection pool and the requests-cache SQLite backend do their own locking
+        # (separate sessions on one cache file could hit "database is locked")
         self.session = requests.Session()
         self.session.headers.update(self.headers)
-
-    def safe_request(self, url, retries=3):
-        """Robustly makes an HTTP GET request with retries and delays."""
+        self.cached_session = requests_cache.CachedSession(
+            self.cache_name, backend='sqlite', expire_after=self.cache_expire_after)
+        self.cached_session.headers.update(self.headers)
+
+    def safe_request(self, url, retries=3, cached=False):
+        """Robustly makes an HTTP GET request with retries and delays.
+        With cached=True the request goes through the on-disk HTTP cache."""
+        session = self.cached_session if cached else self.session
         for i in range(retries):
             try:
-                time.sleep(random.uniform(*self.delay_range))
-                response = self.session.get(url, timeout=20)
+                response = session.get(url, timeout=20)
+                # Pace requests that reached the server; cached responses need no politeness delay
+                if not getattr(response, 'from_cache', False):
+                    time.sleep(random.uniform(*self.delay_range))
                 response.raise_for_status()
                 response.encoding = response.apparent_encoding
                 return response
@@ -48,12 +72,8 @@ class TC260PolicyScraper:
 
     def extract_date_from_text(self, text: str) -> str:
         """Attempts to extract a date from text using common patterns."""
-        date_patterns = [
-            r'(\d{4}[-/年]\d{1,2}[-/月]\d{1,2})日?',
-            r'发布于[:：\s]*(\d{4}[-/年]\d{1,2}[-/月]\d{1,2})',
-        ]
-        for pattern in date_patterns:
-            match = re.search(pattern, text)
+        for pattern in _DATE_PATTERNS:
+            match = pattern.search(text)
             if match:
                 date_str = match.group(1).replace('年', '-').replace('月', '-').replace('/', '-')
                 try:
@@ -81,7 +101,7 @@ class TC260PolicyScraper:
             onclick_attr = item.get('onclick')
             if not onclick_attr: continue
             
-            match = re.search(r"jumpDetail\('([^']*)'", onclick_attr)
+            match = _JUMP_DETAIL_RE.search(onclick_attr)
             if match:
                 article_id = match.group(1)
                 title = item.get_text(strip=True)
@@ -93,10 +113,10 @@ class TC260PolicyScraper:
     def extract_article_content(self, url: str) -> Dict[str, Any]:
         """Extracts content from a single article detail page."""
         logger.info(f"  Scraping details from: {url}")
-        response = self.safe_request(url)
+        response = self.safe_request(url, cached=True)
         if not response: return {}
         
-        soup = BeautifulSoup(response.content, 'html.parser', from_encoding='utf-8')
+        soup = BeautifulSoup(response.content, 'lxml', from_encoding='utf-8')
         
         for element in soup(['script', 'style']):
             element.decompose()
@@ -128,9 +148,9 @@ class TC260PolicyScraper:
             'full_text': content
         }
 
-    def scrape_all_policies(self) -> List[Dict[str, Any]]:
-        """Main scraping loop for all policies."""
-        all_policies = []
+    def collect_article_urls(self) -> List[str]:
+        """Walks the list pages and returns the detail URLs in list order, without duplicates."""
+        article_urls = {}  # insertion-ordered set
         
         for page_num in range(1, self.max_pages + 1):
             list_url = self.get_list_url(page_num)
@@ -141,7 +161,7 @@ class TC260PolicyScraper:
                 logger.error(f"Failed to fetch list page {page_num}. Stopping.")
                 break
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = BeautifulSoup(response.text, 'lxml')
             links = self.extract_article_links(soup)
             
             if not links:
@@ -149,14 +169,29 @@ class TC260PolicyScraper:
                 break
             
             logger.info(f"Found {len(links)} links on page {page_num}.")
-            
-            for url, title in links:
-                if url not in [p['url'] for p in all_policies]:
-                    details = self.extract_article_content(url)
-                    if details and details.get('title') != 'N/A' and details.get('full_text'):
-                        all_policies.append(details)
+            article_urls.update(dict.fromkeys(url for url, title in links))
         
-        return all_policies
+        return list(article_urls)
+
+    def _try_extract_article_content(self, url: str) -> Dict[str, Any]:
+        """extract_article_content that logs errors and returns {} so one bad page cannot abort the batch."""
+        try:
+            return self.extract_article_content(url)
+        except Exception as e:
+            logger.error(f"Error scraping {url}: {e}")
+            return {}
+
+    def fetch_article_details(self, urls: List[str]) -> List[Dict[str, Any]]:
+        """Fetches the given detail pages concurrently and returns the usable policies in URL order."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return [details for details in executor.map(self._try_extract_article_content, urls)
+                    if details and details.get('title') != 'N/A' and details.get('full_text')]
+
+    def scrape_all_policies(self) -> List[Dict[str, Any]]:
+        """Main scraping loop: collect all detail URLs from the list pages, then fetch them concurrently."""
+        urls = self.collect_article_urls()
+        logger.info(f"Collected {len(urls)} article links. Fetching details...")
+        return self.fetch_article_details(urls)
 
     def save_to_csv(self, policies: List[Dict[str, Any]], filename: str) -> str:
         """Saves a list of policy dictionaries to a CSV file."""